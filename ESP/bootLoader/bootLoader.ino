@@ -1,6 +1,7 @@
 
 #include <WiFi.h>
 #include <DHT.h>
+#include "soc/gpio_reg.h"
 
 // Target Wi-Fi credentials
 const char* ssid = "w";
@@ -23,6 +24,24 @@ int allowedPins[] = {13, 12, 14, 27, 26, 25, 33, 32, 35, 34};
 #define DHTTYPE DHT11
 DHT dht(DHTPIN, DHTTYPE);
 
+// Binary protocol (ServerPy/binproto.py), entered with the text line "BIN1".
+// Requests are 3 bytes: opcode, arg0, arg1 (OP_SETMASK, OP_PULSE: 5). Replies are fixed size.
+#define OP_SET 0x01     // pin, state -> status byte
+#define OP_GETALL 0x02  // -> levels u16, reported u16, temp f32, hum f32 (little-endian)
+#define OP_SETMASK 0x03 // mask u16, values u16 -> status byte
+#define OP_PULSE 0x04   // pin, state, ms u16 -> status byte
+#define OP_TEXT 0x7F    // -> status byte, back to text mode
+#define STATUS_OK 0x00
+#define STATUS_INVALID 0x01
+#define STATUS_UNKNOWN_OP 0x02
+
+// Timed pulses (PULSE <pin> <state> <ms>): per allowedPins slot, the level to
+// go back to and when. Any other write to the pin cancels its pending revert.
+#define MAX_PULSE_MS 65535
+bool pulseActive[NUM_PINS];
+uint8_t pulseRevert[NUM_PINS];
+unsigned long pulseDeadline[NUM_PINS];
+
 void setupPins() {
   for (int i = 0; i < NUM_PINS; i++) {
     if (allowedPins[i] == DHTPIN || allowedPins[i] == 34 || allowedPins[i] == 35) continue; // skip DHT and input-only pins
@@ -42,6 +61,113 @@ bool isValidPin(int pin) {
   return false;
 }
 
+int pinSlot(int pin) {
+  for (int i = 0; i < NUM_PINS; i++) {
+    if (allowedPins[i] == pin) return i;
+  }
+  return -1;
+}
+
+void cancelPulse(int pin) {
+  int slot = pinSlot(pin);
+  if (slot >= 0) pulseActive[slot] = false;
+}
+
+bool startPulse(int pin, int state, unsigned long ms) {
+  if (!isValidPin(pin) || (state != 0 && state != 1) || ms < 1 || ms > MAX_PULSE_MS) return false;
+  int slot = pinSlot(pin);
+  digitalWrite(pin, state);
+  pulseRevert[slot] = !state;
+  pulseDeadline[slot] = millis() + ms;
+  pulseActive[slot] = true;
+  return true;
+}
+
+// Revert pulses whose time is up; called on every pass of loop().
+void servicePulses() {
+  unsigned long now = millis();
+  for (int i = 0; i < NUM_PINS; i++) {
+    if (pulseActive[i] && (long)(now - pulseDeadline[i]) >= 0) {
+      digitalWrite(allowedPins[i], pulseRevert[i]);
+      pulseActive[i] = false;
+    }
+  }
+}
+
+// Switch every pin in mask (bit i = allowedPins[i]) to the matching bit of values.
+// Nothing is written unless every masked pin is writable; the writes then go
+// straight to the GPIO set/clear registers so all pins change at the same time.
+bool applyMask(uint32_t mask, uint32_t values) {
+  if (mask >> NUM_PINS) return false;
+  // Check the whole mask first: a rejected mask must leave pulses running
+  for (int i = 0; i < NUM_PINS; i++) {
+    if ((mask & (1UL << i)) && !isValidPin(allowedPins[i])) return false;
+  }
+  uint32_t set0 = 0, clear0 = 0, set1 = 0, clear1 = 0;
+  for (int i = 0; i < NUM_PINS; i++) {
+    if (!(mask & (1UL << i))) continue;
+    int pin = allowedPins[i];
+    bool high = values & (1UL << i);
+    pulseActive[i] = false;
+    if (pin < 32) {
+      if (high) set0 |= 1UL << pin; else clear0 |= 1UL << pin;
+    } else {
+      if (high) set1 |= 1UL << (pin - 32); else clear1 |= 1UL << (pin - 32);
+    }
+  }
+  REG_WRITE(GPIO_OUT_W1TS_REG, set0);
+  REG_WRITE(GPIO_OUT_W1TC_REG, clear0);
+  REG_WRITE(GPIO_OUT1_W1TS_REG, set1);
+  REG_WRITE(GPIO_OUT1_W1TC_REG, clear1);
+  return true;
+}
+
+
+// Handle one binary request; returns false when the client asks for text mode again.
+bool handleBinary(WiFiClient &client, const uint8_t *req) {
+  uint8_t opcode = req[0];
+  if (opcode == OP_SET) {
+    int pin = req[1], state = req[2];
+    if (isValidPin(pin) && (state == 0 || state == 1)) {
+      cancelPulse(pin);
+      digitalWrite(pin, state);
+      client.write((uint8_t)STATUS_OK);
+    } else {
+      client.write((uint8_t)STATUS_INVALID);
+    }
+  } else if (opcode == OP_GETALL) {
+    uint16_t levels = 0, reported = 0;
+    for (int i = 0; i < NUM_PINS; i++) {
+      if (allowedPins[i] == DHTPIN) continue;
+      reported |= 1 << i;
+      if (digitalRead(allowedPins[i])) levels |= 1 << i;
+    }
+    float temp = dht.readTemperature();
+    float hum = dht.readHumidity();
+    uint8_t reply[12];
+    memcpy(reply, &levels, 2);
+    memcpy(reply + 2, &reported, 2);
+    memcpy(reply + 4, &temp, 4);
+    memcpy(reply + 8, &hum, 4);
+    client.write(reply, sizeof(reply));
+  } else if (opcode == OP_SETMASK) {
+    uint16_t mask, values;
+    memcpy(&mask, req + 1, 2);
+    memcpy(&values, req + 3, 2);
+    client.write((uint8_t)(applyMask(mask, values) ? STATUS_OK : STATUS_INVALID));
+  } else if (opcode == OP_PULSE) {
+    uint16_t ms;
+    memcpy(&ms, req + 3, 2);
+    client.write((uint8_t)(startPulse(req[1], req[2], ms) ? STATUS_OK : STATUS_INVALID));
+  } else if (opcode == OP_TEXT) {
+    client.write((uint8_t)STATUS_OK);
+    return false;
+  } else {
+    client.write((uint8_t)STATUS_UNKNOWN_OP);
+  }
+  return true;
+}
+
 
 void setup() {
   Serial.begin(115200);
@@ -101,19 +227,35 @@ void setup() {
 
 
 void loop() {
+  servicePulses();
   WiFiClient client = server.available();
   if (client) {
     Serial.println("Client connected!");
+    bool binaryMode = false;
     while (client.connected()) {
       Serial.printf("Waiting ...\r");
-      if (client.available()) {
+      servicePulses();
+      if (binaryMode) {
+        int opcode = client.peek();
+        int size = (opcode == OP_SETMASK || opcode == OP_PULSE) ? 5 : 3;
+        if (client.available() >= size) {
+          uint8_t req[5];
+          client.read(req, size);
+          binaryMode = handleBinary(client, req);
+        }
+      } else if (client.available()) {
         String data = client.readStringUntil('\n');
         Serial.print("Recived data: ");
         Serial.println(data);
         data.trim();
 
         int pin, state;
-        if (data.equalsIgnoreCase("GETALL")) {
+        unsigned int mask, values;
+        unsigned long ms;
+        if (data.equals("BIN1")) {
+          client.println("BIN1 OK");
+          binaryMode = true;
+        } else if (data.equalsIgnoreCase("GETALL")) {
           // Read all digital pins except DHTPIN
           for (int i = 0; i < NUM_PINS; i++) {
             if (allowedPins[i] == DHTPIN) continue;
@@ -126,8 +268,23 @@ void loop() {
           float hum = dht.readHumidity();
           client.printf("TEMP:%f,HUM:%f\n", temp, hum);
           Serial.printf("DHT Sensor - Temp: %f, Hum: %f\n", temp, hum);
+        } else if (sscanf(data.c_str(), "SETMASK %u %u", &mask, &values) == 2) {
+          if (applyMask(mask, values)) {
+            client.println("OK");
+            Serial.printf("Set mask %u to %u\n", mask, values);
+          } else {
+            client.println("Invalid pin or state");
+          }
+        } else if (sscanf(data.c_str(), "PULSE %d %d %lu", &pin, &state, &ms) == 3) {
+          if (startPulse(pin, state, ms)) {
+            client.println("OK");
+            Serial.printf("Pulse pin %d to %d for %lu ms\n", pin, state, ms);
+          } else {
+            client.println("Invalid pin or state");
+          }
         } else if (sscanf(data.c_str(), "%d %d", &pin, &state) == 2) {
           if (isValidPin(pin) && (state == 0 || state == 1)) {
+            cancelPulse(pin);
             digitalWrite(pin, state);
             client.println("OK");
             Serial.printf("Set pin %d to %d\n", pin, state);
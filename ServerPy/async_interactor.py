@@ -0,0 +1,187 @@
+import asyncio
+from typing import Literal, Optional, Dict, Iterable, List, Tuple, Union
+
+from connection import CONNECT_TIMEOUT, Backoff, CircuitBreaker, DeviceUnavailable
+from esp_id import get_esp_ip
+from interactor import (
+    PinSnapshot,
+    SOCKET_TIMEOUT,
+    encode_commands,
+    logger,
+    mask_unsupported,
+    normalize_commands,
+    parse_pin_snapshot,
+    pin_mask,
+    validate_pin_state,
+    validate_pulse,
+)
+
+
+class AsyncESP32Interactor:
+    """asyncio counterpart of ESP32Interactor for event-loop frontends.
+
+    Every wait (connect, response read) is awaited with a timeout, and
+    while the circuit breaker is open a command fails with DeviceUnavailable
+    without trying to connect, so a missing board never stalls the loop
+    (or outlasts an interaction's reply deadline). A command that is
+    cancelled or times out drops the connection, because its response
+    may still be in flight and would be read as the answer to the next one.
+    """
+
+    def __init__(self, host: str = "", port: int = 1234, retry_count: int = 3,
+                 timeout: float = SOCKET_TIMEOUT):
+        if not host:
+            hosts = get_esp_ip(port)
+            if not hosts:
+                raise ValueError("Could not find esp on our hotspot")
+            host = hosts[0]
+        self.host = host
+        self.port = port
+        # As in ESP32Interactor: consecutive connect failures before the circuit opens
+        self.retry_count = retry_count
+        self.timeout = timeout
+        self.backoff = Backoff()
+        self.breaker = CircuitBreaker(retry_count)
+        self.pin_states: Dict[int, Literal[0, 1]] = {}
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self):
+        """Open the TCP connection with one attempt of at most CONNECT_TIMEOUT seconds.
+
+        Raises DeviceUnavailable straight away while the breaker is open;
+        it lets an attempt through again after a jittered backoff.
+        """
+        if self.connected:
+            return
+        if not self.breaker.allow():
+            raise DeviceUnavailable(
+                f"ESP32 at {self.host}:{self.port} is unavailable (circuit {self.breaker.state})"
+            )
+        try:
+            logger.info(f"Connecting to ESP32 at {self.host}:{self.port}...")
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), min(self.timeout, CONNECT_TIMEOUT)
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            logger.warning(f"Failed to connect to ESP32: {e}")
+            self._reader = self._writer = None
+            self.breaker.record_failure(self.backoff.next_delay())
+            raise DeviceUnavailable(f"Could not connect to ESP32 at {self.host}:{self.port}") from e
+        self.breaker.record_success()
+        self.backoff.reset()
+        logger.info("Connection established.")
+
+    async def disconnect(self):
+        """Close the connection."""
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is None:
+            return
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        logger.info("Disconnected from ESP32.")
+
+    async def _read_frame(self) -> bytes:
+        line = await asyncio.wait_for(self._reader.readline(), self.timeout)
+        if not line:
+            raise ConnectionError("Disconnected unexpectedly.")
+        return line
+
+    async def _read_line(self) -> str:
+        return (await self._read_frame()).decode().strip()
+
+    async def _exchange(self, payload: bytes, responses: int, raw: bool = False) -> List[Union[str, bytes]]:
+        """Write payload and read back `responses` lines (undecoded frames if raw), one exchange at a time."""
+        async with self._lock:
+            await self.connect()
+            try:
+                self._writer.write(payload)
+                await asyncio.wait_for(self._writer.drain(), self.timeout)
+                read = self._read_frame if raw else self._read_line
+                return [await read() for _ in range(responses)]
+            except BaseException:
+                # Timeout, cancellation or I/O error: the stream position is
+                # unknown now, so start the next command on a fresh socket.
+                await asyncio.shield(self.disconnect())
+                raise
+
+    async def set_pin_state(self, pin: int, state: Literal[0, 1]) -> str:
+        """Send pin state command to ESP32 and track it locally."""
+        validate_pin_state(pin, state)
+        logger.info(f"Sending command: {pin} {state}")
+        response, = await self._exchange(f"{pin} {state}\n".encode(), 1)
+        if "OK" in response:
+            self.pin_states[pin] = state
+            logger.info(f"Pin {pin} updated to {state}")
+        else:
+            logger.warning(f"ESP32 did not confirm state change: {response}")
+        return response
+
+    async def set_pin_states(
+        self,
+        commands: Union[Dict[int, int], Iterable[Tuple[int, int]]],
+    ) -> List[Tuple[int, int, str]]:
+        """Pipelined variant, see ESP32Interactor.set_pin_states."""
+        commands = normalize_commands(commands)
+        if not commands:
+            return []
+
+        logger.info(f"Sending {len(commands)} pipelined commands")
+        responses = await self._exchange(encode_commands(commands), len(commands))
+
+        results = []
+        for (pin, state), response in zip(commands, responses):
+            if "OK" in response:
+                self.pin_states[pin] = state
+            else:
+                logger.warning(f"ESP32 did not confirm pin {pin} -> {state}: {response}")
+            results.append((pin, state, response))
+        return results
+
+    async def set_pins(self, states: Union[Dict[int, int], Iterable[Tuple[int, int]]]) -> str:
+        """Atomic multi-pin write, see ESP32Interactor.set_pins."""
+        commands = normalize_commands(states)
+        if not commands:
+            return "OK"
+        mask, values = pin_mask(commands)
+        logger.info(f"Sending SETMASK for pins {[pin for pin, _ in commands]}")
+        response, = await self._exchange(f"SETMASK {mask} {values}\n".encode(), 1)
+        if mask_unsupported(response):
+            logger.warning("ESP32 does not support SETMASK; sending pins one by one.")
+            failed = [r for _, _, r in await self.set_pin_states(commands) if "OK" not in r]
+            return failed[0] if failed else "OK"
+        if "OK" in response:
+            self.pin_states.update(commands)
+        else:
+            logger.warning(f"ESP32 rejected SETMASK {mask:#x}/{values:#x}: {response}")
+        return response
+
+    async def pulse(self, pin: int, state: Literal[0, 1], duration_ms: int) -> str:
+        """Board-timed pulse, see ESP32Interactor.pulse."""
+        validate_pulse(pin, state, duration_ms)
+        logger.info(f"Sending pulse: {pin} {state} for {duration_ms} ms")
+        response, = await self._exchange(f"PULSE {pin} {state} {duration_ms}\n".encode(), 1)
+        if "OK" in response:
+            self.pin_states[pin] = 1 - state
+        elif mask_unsupported(response):
+            logger.warning("ESP32 does not support PULSE; timing the pulse here.")
+            response = await self.set_pin_state(pin, state)
+            if "OK" in response:
+                await asyncio.sleep(duration_ms / 1000)
+                response = await self.set_pin_state(pin, 1 - state)
+        else:
+            logger.warning(f"ESP32 rejected pulse on pin {pin}: {response}")
+        return response
+
+    async def get_all_pin_states(self) -> PinSnapshot:
+        """Fetch all pin states and the DHT reading from ESP32 using the GETALL command."""
+        frame, = await self._exchange(b"GETALL\n", 1, raw=True)
+        return parse_pin_snapshot(frame)
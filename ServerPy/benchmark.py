@@ -0,0 +1,755 @@
+"""Benchmarks for the ESP32 TCP client.
+
+Runs against simulated boards (simulator.py) so no hardware is needed:
+
+    python benchmark.py                                  # all cases, loopback + lan
+    python benchmark.py --profiles wifi --out run.json
+    python benchmark.py --compare baseline.json --out run.json
+    python benchmark.py --profiles "" --ws ws://127.0.0.1:5000/ws --ws-clients 1,8,32
+    python benchmark.py --profiles "" --scheduler-jobs 5000 --scheduler-boards 20
+    python benchmark.py --profiles "" --startup server,runner,telegram_bot,discord_bot
+    python benchmark.py --profiles "" --chunks "uploads/*.webm"
+    python benchmark.py --profiles "" --gesture "uploads/*.webm" --gesture-processes 0,1,2,4
+
+Each case reports commands/sec and p50/p95/p99 latency per call. Results
+are written as JSON so interactor.py changes can be compared run to run.
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import binproto
+import chunks
+import interactor
+from interactor import ESP32Interactor, logger, parse_pin_snapshot
+from fleet import DeviceFleet
+from main import BLINKER_PINS, blinker_patterns
+from patterns import PatternPlayer, compile_patterns
+from scheduler import PinScheduler
+from simulator import PROFILES, ESP32Simulator, start_simulators
+from sampler import FrameSampler, thumbnail
+from streams import StreamSession
+from video_worker import FINGER_TO_PIN, GesturePool, GestureWorker, get_finger_states, load_vision
+
+
+class LegacyInteractor(ESP32Interactor):
+    """Interactor using the original one-byte-per-recv reader, for comparison.
+
+    Overrides _read_frame, which both text replies and GETALL snapshots go through.
+    """
+
+    def _read_frame(self) -> bytes:
+        if not self.sock:
+            raise RuntimeError("Not connected to ESP32.")
+        buffer = b""
+        while not buffer.endswith(b"\n"):
+            data = self.sock.recv(1)
+            self.recv_calls += 1
+            if not data:
+                raise ConnectionError("Disconnected unexpectedly.")
+            buffer += data
+        return buffer[:-1]
+
+
+def legacy_parse_pin_states(line: str) -> Dict[str, str]:
+    """The original GETALL parser (two splits per entry, string keys), for comparison."""
+    pin_values = line.split(',')
+    return {i.split(":")[0]:i.split(":")[1] for i in pin_values}
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    rank = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def measure(call: Callable[[int], object], iterations: int, commands_per_call: int = 1,
+            on_error: Callable[[], None] = None) -> Dict[str, float]:
+    """Time `iterations` calls and summarise throughput and latency."""
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        try:
+            call(i)
+        except Exception:
+            errors += 1
+            if on_error:
+                on_error()
+            continue
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "calls": iterations,
+        "errors": errors,
+        "seconds": round(elapsed, 6),
+        "commands_per_sec": round(len(latencies) * commands_per_call / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1e3, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1e3, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1e3, 3),
+    }
+
+
+def run_cases(sim: ESP32Simulator, iterations: int) -> Dict[str, Dict[str, float]]:
+    esp = ESP32Interactor("127.0.0.1", sim.port)
+    esp.connect()
+    reset = esp.disconnect
+    results = {}
+
+    results["set_pin_state"] = measure(
+        lambda i: esp.set_pin_state(13, i & 1), iterations, on_error=reset)
+    results["get_all_pin_states"] = measure(
+        lambda i: esp.get_all_pin_states(), iterations, on_error=reset)
+    results["set_pin_states x5"] = measure(
+        lambda i: esp.set_pin_states([(pin, i & 1) for pin in (13, 12, 14, 27, 25)]),
+        iterations, commands_per_call=5, on_error=reset)
+    # One board-timed message instead of an on/off pair
+    results["pulse"] = measure(lambda i: esp.pulse(13, 1, 1), iterations, on_error=reset)
+
+    for pattern in blinker_patterns(esp):
+        # One warm-up run tells us how many wire commands the pattern sends
+        random.seed(0)
+        before = sim.stats["commands"]
+        try:
+            pattern()
+        except Exception:
+            reset()
+        per_run = sim.stats["commands"] - before
+        results[f"blinker.{pattern.__name__}"] = measure(
+            lambda i, p=pattern: p(), max(1, iterations // 20),
+            commands_per_call=per_run, on_error=reset)
+
+    def reconnect(i):
+        esp.disconnect()
+        esp.connect()
+        esp.set_pin_state(13, i & 1)
+    results["reconnect"] = measure(reconnect, max(1, iterations // 10), on_error=reset)
+
+    esp.disconnect()
+    return results
+
+
+def run_pattern_rate(sim: ESP32Simulator) -> Dict[str, Dict[str, float]]:
+    """Highest frame rate the compiled blinker cycle sustains; latency columns are frame lateness."""
+    frames = compile_patterns(BLINKER_PINS)
+    with PatternPlayer(ESP32Interactor("127.0.0.1", sim.port)) as player:
+        fps = player.max_frame_rate(frames)
+        run = player.play(frames, fps) if fps else {}
+    return {"patterns.max_fps": {
+        "calls": run.get("frames", 0),
+        "errors": run.get("errors", 0),
+        "seconds": round(run.get("frames", 0) / fps, 6) if fps else 0.0,
+        "commands_per_sec": fps,
+        "p50_ms": run.get("lateness_p50_ms", float("nan")),
+        "p95_ms": run.get("lateness_p95_ms", float("nan")),
+        "p99_ms": run.get("lateness_p99_ms", float("nan")),
+    }}
+
+
+def run_reader_comparison(port: int, iterations: int) -> Dict[str, Dict[str, float]]:
+    """recv() calls and time per response, legacy one-byte reader vs buffered."""
+    results = {}
+    for label, cls in (("legacy", LegacyInteractor), ("buffered", ESP32Interactor)):
+        esp = cls("127.0.0.1", port)
+        esp.connect()
+        for case, call in (
+            ("set_pin_state", lambda i: esp.set_pin_state(13, i & 1)),
+            ("get_all_pin_states", lambda i: esp.get_all_pin_states()),
+        ):
+            esp.recv_calls = 0
+            stats = measure(call, iterations)
+            stats["recv_per_response"] = round(esp.recv_calls / iterations, 2)
+            results[f"reader.{label}.{case}"] = stats
+        esp.disconnect()
+    return results
+
+
+def run_protocol_comparison(sim: ESP32Simulator, iterations: int) -> Dict[str, Dict[str, float]]:
+    """Text vs negotiated binary framing: throughput, latency and wire bytes per command."""
+    results = {}
+    for label, binary in (("text", False), ("binary", True)):
+        esp = ESP32Interactor("127.0.0.1", sim.port, binary=binary)
+        esp.connect()
+        for case, call, per_call in (
+            ("set_pin_state", lambda i: esp.set_pin_state(13, i & 1), 1),
+            ("set_pin_states x5", lambda i: esp.set_pin_states(
+                [(pin, i & 1) for pin in (13, 12, 14, 27, 25)]), 5),
+            ("get_all_pin_states", lambda i: esp.get_all_pin_states(), 1),
+        ):
+            before_in, before_out = sim.stats["bytes_in"], sim.stats["bytes_out"]
+            stats = measure(call, iterations, commands_per_call=per_call, on_error=esp.disconnect)
+            commands = iterations * per_call
+            stats["bytes_sent_per_command"] = round((sim.stats["bytes_in"] - before_in) / commands, 2)
+            stats["bytes_received_per_command"] = round((sim.stats["bytes_out"] - before_out) / commands, 2)
+            results[f"protocol.{label}.{case}"] = stats
+        esp.disconnect()
+    return results
+
+
+def run_parser_comparison(iterations: int, batch: int = 1000) -> Dict[str, Dict[str, float]]:
+    """GETALL parse rate and retained memory: legacy dict parser, text PinSnapshot, binary reply."""
+    with ESP32Simulator(port=0) as sim:
+        reply = sim.execute("GETALL")
+        packed = sim.execute_binary(binproto.GETALL_REQUEST)
+    frame = reply.rstrip("\n").encode()
+    results = {}
+    for label, parse in (
+        ("legacy", lambda: legacy_parse_pin_states(frame.decode().strip())),
+        ("snapshot", lambda: parse_pin_snapshot(frame)),
+        ("binary", lambda: binproto.decode_snapshot(packed)),
+    ):
+        def run(i):
+            for _ in range(batch):
+                parse()
+        stats = measure(run, max(1, iterations // 10), commands_per_call=batch)
+        tracemalloc.start()
+        kept = [parse() for _ in range(batch)]
+        stats["retained_bytes"] = round(tracemalloc.get_traced_memory()[0] / batch, 1)
+        tracemalloc.stop()
+        del kept
+        results[f"parser.{label}"] = stats
+    return results
+
+
+def run_ws_load(url: str, clients: int, toggles: int, window: int = 8) -> Dict[str, float]:
+    """Toggle over `clients` concurrent /ws connections, each keeping up to `window` acks outstanding.
+
+    Needs simple-websocket (installed with flask-sock) and a running server.py or runner.py.
+    """
+    from simple_websocket import Client
+
+    latencies: List[float] = []
+    per_connection: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def client(n: int):
+        try:
+            ws = Client.connect(url)
+        except Exception:
+            with lock:
+                errors[0] += toggles
+            return
+        pending = {}
+        mine, failed = [], 0
+        sent = 0
+        start = time.perf_counter()
+        try:
+            while len(mine) + failed < toggles:
+                while sent < toggles and len(pending) < window:
+                    pending[sent] = time.perf_counter()
+                    ws.send(json.dumps({"id": sent, "type": "toggle", "device": "light", "state": sent & 1}))
+                    sent += 1
+                raw = ws.receive(timeout=5)
+                if raw is None:
+                    failed += len(pending)
+                    pending.clear()
+                    break
+                msg = json.loads(raw)
+                if msg.get("type") != "ack" or msg.get("id") not in pending:
+                    continue
+                t0 = pending.pop(msg["id"])
+                if msg.get("ok"):
+                    mine.append(time.perf_counter() - t0)
+                else:
+                    failed += 1
+        finally:
+            ws.close()
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.extend(mine)
+            errors[0] += toggles - len(mine)
+            per_connection.append(len(mine) / elapsed if elapsed else 0.0)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "calls": clients * toggles,
+        "errors": errors[0],
+        "seconds": round(elapsed, 6),
+        "commands_per_sec": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "per_connection_per_sec": round(sum(per_connection) / len(per_connection), 1) if per_connection else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1e3, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1e3, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1e3, 3),
+    }
+
+
+def run_scheduler_load(jobs: int, boards: int, spread: float = 2.0) -> Dict[str, float]:
+    """Schedule `jobs` one-shot writes spread over `spread` seconds across `boards` simulators.
+
+    The latency columns are scheduling lateness: how long after its deadline each action started.
+    """
+    sims = start_simulators(boards, base_port=0)
+    lateness: List[float] = []
+    errors = [0]
+    done = threading.Event()
+    lock = threading.Lock()
+    try:
+        with DeviceFleet([f"127.0.0.1:{sim.port}" for sim in sims]) as fleet:
+            hosts = fleet.hosts
+            fleet.connect()
+
+            def action(due: float, host: str, state: int):
+                def run(target):
+                    late = time.monotonic() - due
+                    ok = target.set_pin_state(13, state, hosts=[host]).ok
+                    with lock:
+                        lateness.append(late)
+                        errors[0] += not ok
+                        if len(lateness) == jobs:
+                            done.set()
+                return run
+
+            with PinScheduler(fleet) as sched:
+                start = time.monotonic() + 0.2
+                for i in range(jobs):
+                    due = start + spread * i / jobs
+                    sched.call_at(due, action(due, hosts[i % len(hosts)], i & 1))
+                done.wait(spread + 30)
+    finally:
+        for sim in sims:
+            sim.stop()
+    lateness.sort()
+    return {
+        "calls": jobs,
+        "errors": errors[0] + jobs - len(lateness),
+        "seconds": spread,
+        "commands_per_sec": round(len(lateness) / spread, 1),
+        "p50_ms": round(percentile(lateness, 50) * 1e3, 3),
+        "p95_ms": round(percentile(lateness, 95) * 1e3, 3),
+        "p99_ms": round(percentile(lateness, 99) * 1e3, 3),
+    }
+
+
+_STARTUP_SCRIPT = """
+import time
+t0 = time.perf_counter()
+import {module} as m
+t1 = time.perf_counter()
+if {serve}:
+    m.create_app().test_client().get("/")
+print(t1 - t0, time.perf_counter() - t0)
+"""
+
+
+def run_startup(modules: List[str], runs: int = 5) -> Dict[str, Dict[str, float]]:
+    """Cold start of each frontend, in a fresh interpreter per run.
+
+    "import" is the time to import the module; "first request" adds building
+    the Flask app and serving GET / (for modules with a create_app factory).
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for module in modules:
+        with open(os.path.join(here, f"{module}.py")) as fp:
+            serve = "def create_app(" in fp.read()
+        timings: Dict[str, List[float]] = {"import": [], "first request": []}
+        errors = 0
+        for _ in range(runs):
+            proc = subprocess.run([sys.executable, "-c", _STARTUP_SCRIPT.format(module=module, serve=serve)],
+                                  cwd=here, capture_output=True, text=True, timeout=120)
+            if proc.returncode:
+                errors += 1
+                continue
+            imported, served = map(float, proc.stdout.split()[-2:])
+            timings["import"].append(imported)
+            if serve:
+                timings["first request"].append(served)
+        if errors == runs:
+            logger.error(f"Could not start {module}: {proc.stderr.strip().splitlines()[-1:]}")
+        for stage, values in timings.items():
+            if stage == "first request" and not serve:
+                continue
+            values.sort()
+            results[f"startup.{stage} {module}"] = {
+                "calls": runs,
+                "errors": errors,
+                "seconds": round(sum(values), 3),
+                "commands_per_sec": round(len(values) / sum(values), 1) if values else 0.0,
+                "p50_ms": round(percentile(values, 50) * 1e3, 3),
+                "p95_ms": round(percentile(values, 95) * 1e3, 3),
+                "p99_ms": round(percentile(values, 99) * 1e3, 3),
+            }
+    return results
+
+
+def _open_chunk(path: str):
+    """What the video worker does with a chunk path: decode it with OpenCV if
+    installed, else just read it back (the I/O part of opening it)."""
+    try:
+        import cv2
+    except ImportError:
+        with open(path, "rb") as fp:
+            fp.read()
+        return
+    cap = cv2.VideoCapture(path)
+    while cap.read()[0]:
+        pass
+    cap.release()
+
+
+def run_chunk_io(paths: List[str], repeats: int = 5) -> Dict[str, Dict[str, float]]:
+    """Per-chunk cost of handing an upload to the decoder, as runner.upload does.
+
+    "disk" saves the chunk next to the samples, opens it and deletes it;
+    "memory" keeps it in a chunks.MemoryChunk. disk_bytes counts bytes
+    written to regular files, i.e. not to a memfd or tmpfs.
+    """
+    samples = []
+    for path in paths:
+        with open(path, "rb") as fp:
+            samples.append((os.path.basename(path), fp.read()))
+    total = sum(len(data) for _, data in samples) * repeats
+    upload_dir = os.path.dirname(os.path.abspath(paths[0]))
+
+    def via_disk(name, data):
+        fd, path = tempfile.mkstemp(suffix=os.path.splitext(name)[1], dir=upload_dir)
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(data)
+        try:
+            _open_chunk(path)
+        finally:
+            os.remove(path)
+
+    def via_memory(name, data):
+        with chunks.chunk_path(chunks.MemoryChunk(name, data)) as path:
+            _open_chunk(path)
+
+    results = {}
+    for case, handle, disk_bytes in (("disk", via_disk, total),
+                                     ("memory", via_memory, total if chunks.backend() == "disk" else 0)):
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(repeats):
+            for name, data in samples:
+                t0 = time.perf_counter()
+                handle(name, data)
+                latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        label = case if case == "disk" else f"memory ({chunks.backend()})"
+        results[f"chunk.{label}"] = {
+            "calls": len(latencies),
+            "errors": 0,
+            "seconds": round(elapsed, 3),
+            "commands_per_sec": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1e3, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1e3, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1e3, 3),
+            "disk_bytes": disk_bytes,
+        }
+    return results
+
+
+def run_gesture_overhead(paths: List[str]) -> Dict[str, Dict[str, float]]:
+    """Per-chunk gesture analysis against a simulated board, building the Hands
+    model and board connection for every chunk vs. keeping them in one worker.
+
+    The latency columns are whole chunks; setup_* is the fixed part (creating,
+    connecting and closing resources) that persistence removes.
+    """
+    try:
+        load_vision()
+    except ImportError as e:
+        logger.error(f"Gesture benchmark needs OpenCV and MediaPipe: {e}")
+        return {}
+    results = {}
+    with ESP32Simulator(port=0, profile=PROFILES["loopback"], seed=0) as sim:
+        for case, persistent in (("fresh per chunk", False), ("persistent", True)):
+            worker = GestureWorker("127.0.0.1", sim.port, persistent=persistent)
+            latencies = []
+            errors = 0
+            started = time.perf_counter()
+            for path in paths:
+                t0 = time.perf_counter()
+                try:
+                    worker.process(path, session_id="benchmark")
+                except Exception:
+                    errors += 1
+                latencies.append(time.perf_counter() - t0)
+            elapsed = time.perf_counter() - started
+            stats = worker.stats()
+            worker.close()
+            latencies.sort()
+            results[f"gesture.{case}"] = {
+                "calls": len(paths),
+                "errors": errors,
+                "seconds": round(elapsed, 3),
+                "commands_per_sec": round(len(paths) / elapsed, 1),
+                "p50_ms": round(percentile(latencies, 50) * 1e3, 3),
+                "p95_ms": round(percentile(latencies, 95) * 1e3, 3),
+                "p99_ms": round(percentile(latencies, 99) * 1e3, 3),
+                "setup_p50_ms": stats["setup_p50_ms"],
+                "setup_p99_ms": stats["setup_p99_ms"],
+            }
+    return results
+
+
+def run_gesture_scaling(paths: List[str], counts: List[int], rounds: int = 3) -> Dict[str, Dict[str, float]]:
+    """Chunks/sec through GesturePool with each process count; the latency
+    columns are submit-to-applied per chunk (queueing included)."""
+    try:
+        load_vision()
+    except ImportError as e:
+        logger.error(f"Gesture benchmark needs OpenCV and MediaPipe: {e}")
+        return {}
+    results = {}
+    with ESP32Simulator(port=0, profile=PROFILES["loopback"], seed=0) as sim:
+        for processes in counts:
+            pool = GesturePool(processes, "127.0.0.1", sim.port)
+            # Warm up: start the processes and load every model before timing
+            warm = [pool.submit(path, i, session_id="warmup")
+                    for i, path in enumerate(paths[:max(1, processes)], 1)]
+            for future in warm:
+                future.exception()
+            latencies = []
+            errors = [0]
+            lock = threading.Lock()
+            started = time.perf_counter()
+            for n, path in enumerate(paths * rounds, 1):
+                def done(frames, error, t0=time.perf_counter()):
+                    with lock:
+                        latencies.append(time.perf_counter() - t0)
+                        errors[0] += error is not None
+                pool.submit(path, n, session_id="benchmark", on_done=done)
+            pool.close()
+            elapsed = time.perf_counter() - started
+            latencies.sort()
+            results[f"gesture.pool x{processes} processes"] = {
+                "calls": len(latencies),
+                "errors": errors[0],
+                "seconds": round(elapsed, 3),
+                "commands_per_sec": round(len(latencies) / elapsed, 1),
+                "p50_ms": round(percentile(latencies, 50) * 1e3, 3),
+                "p95_ms": round(percentile(latencies, 95) * 1e3, 3),
+                "p99_ms": round(percentile(latencies, 99) * 1e3, 3),
+            }
+    return results
+
+
+def run_gesture_commands(paths: List[str]) -> Dict[str, float]:
+    """Pin writes per minute of video for the chunks as one stream, with the
+    finger state reset at every chunk (the old behaviour) vs. carried over."""
+    try:
+        load_vision()
+    except ImportError as e:
+        logger.error(f"Gesture benchmark needs OpenCV and MediaPipe: {e}")
+        return {}
+    worker = GestureWorker(persistent=True)
+    carried = StreamSession("benchmark")
+    reset = 0
+    seconds = 0.0
+    for path in paths:
+        _, states, length = worker.detect(path, session_id="benchmark")
+        reset += len(StreamSession("chunk").changes(states, FINGER_TO_PIN))
+        carried.changes(states, FINGER_TO_PIN)
+        seconds += length
+    worker.close()
+    minutes = seconds / 60 or float("nan")
+    return {
+        "chunks": len(paths),
+        "video_seconds": round(seconds, 1),
+        "per_chunk_reset_per_minute": round(reset / minutes, 1),
+        "carried_per_minute": round(carried.commands / minutes, 1),
+    }
+
+
+def run_sampler_accuracy(paths: List[str], pressures=(0.0, 0.5, 1.0)) -> Dict[str, Dict[str, float]]:
+    """Frames inferred per chunk, and gesture accuracy, for the old fixed
+    every-3rd-frame stride and for FrameSampler at several pressures.
+
+    Every frame is inferred once as the reference. A sampled run holds the
+    finger state of its last inferred frame; accuracy is the share of
+    frames where that matches the reference (no hand counts as a state).
+    The chunks are treated as one stream, in name order.
+    """
+    try:
+        cv2, mp_hands = load_vision()
+    except ImportError as e:
+        logger.error(f"Sampler benchmark needs OpenCV and MediaPipe: {e}")
+        return {}
+    samples = []  # per chunk: (thumbnails, reference states)
+    with mp_hands.Hands(static_image_mode=False, max_num_hands=1,
+                        min_detection_confidence=0.6, min_tracking_confidence=0.5) as hands:
+        for path in paths:
+            cap = cv2.VideoCapture(path)
+            thumbs, truth = [], []
+            while True:
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                frame = cv2.flip(frame, 1)
+                result = hands.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                landmarks = result.multi_hand_landmarks
+                truth.append(tuple(get_finger_states(landmarks[0])) if landmarks else None)
+                thumbs.append(thumbnail(frame))
+            cap.release()
+            samples.append((thumbs, truth))
+
+    def score(pick) -> Dict[str, float]:
+        held = None
+        inferred = matched = total = 0
+        for n, (thumbs, truth) in enumerate(samples):
+            for i, (thumb, state) in enumerate(zip(thumbs, truth)):
+                if pick(n, i, thumb):
+                    inferred += 1
+                    held = state
+                matched += held == state
+                total += 1
+        return {
+            "chunks": len(samples),
+            "frames": total,
+            "inferred_per_chunk": round(inferred / max(1, len(samples)), 1),
+            "accuracy": round(matched / max(1, total), 4),
+        }
+
+    results = {"fixed every 3rd frame": score(lambda n, i, thumb: (i + 1) % 3 == 0)}
+    for pressure in pressures:
+        # Thumbnails are already downscaled, so the sampler takes them as they are
+        sampler = FrameSampler(step=1)
+        sampler.start(pressure)
+        results[f"adaptive, pressure {pressure}"] = score(lambda n, i, thumb: sampler.should_infer(thumb))
+    return results
+
+
+def print_table(profile: str, results: Dict[str, Dict[str, float]]):
+    print(f"\n[{profile}]")
+    print(f"{'case':<34} {'cmd/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'err':>5}")
+    for case, r in results.items():
+        print(f"{case:<34} {r['commands_per_sec']:>10.1f} {r['p50_ms']:>9.3f} "
+              f"{r['p95_ms']:>9.3f} {r['p99_ms']:>9.3f} {r['errors']:>5}")
+
+
+def print_comparison(baseline: dict, current: dict):
+    print("\nChange vs baseline (cmd/s, p99):")
+    for profile, cases in current["results"].items():
+        base_cases = baseline.get("results", {}).get(profile, {})
+        for case, r in cases.items():
+            b = base_cases.get(case)
+            if not b or not b["commands_per_sec"] or not b["p99_ms"]:
+                continue
+            rate = (r["commands_per_sec"] / b["commands_per_sec"] - 1) * 100
+            p99 = (r["p99_ms"] / b["p99_ms"] - 1) * 100
+            print(f"  {profile:<9} {case:<34} {rate:>+8.1f}% {p99:>+8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--profiles", default="loopback,lan",
+                        help=f"comma-separated, from: {', '.join(sorted(PROFILES))}")
+    parser.add_argument("--timeout", type=float, default=1.0,
+                        help="socket timeout so dropped replies do not stall a run")
+    parser.add_argument("--ws", help="load-test a running dashboard's WebSocket, e.g. ws://127.0.0.1:5000/ws")
+    parser.add_argument("--ws-clients", default="1,8,32", help="comma-separated concurrent connection counts")
+    parser.add_argument("--ws-toggles", type=int, default=200, help="toggles per connection")
+    parser.add_argument("--scheduler-jobs", type=int, default=0,
+                        help="load-test scheduler.py with this many timed writes (lateness in the ms columns)")
+    parser.add_argument("--scheduler-boards", type=int, default=10)
+    parser.add_argument("--startup", default="",
+                        help="comma-separated frontend modules to time cold imports of, e.g. server,runner")
+    parser.add_argument("--chunks", help="time the upload-to-decoder path for these video chunks, e.g. 'uploads/*.webm'")
+    parser.add_argument("--gesture", help="time per-chunk gesture analysis on these video chunks, e.g. 'uploads/*.webm'")
+    parser.add_argument("--gesture-processes", default="",
+                        help="with --gesture, also time GesturePool throughput for these process counts, e.g. 0,1,2,4")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --out")
+    args = parser.parse_args()
+
+    logger.setLevel(logging.ERROR)
+    logging.getLogger("ESP32Simulator").setLevel(logging.WARNING)
+    interactor.SOCKET_TIMEOUT = args.timeout
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+        },
+        "results": {},
+    }
+    for profile in filter(None, args.profiles.split(",")):
+        with ESP32Simulator(port=0, profile=PROFILES[profile], seed=0) as sim:
+            results = run_cases(sim, args.iterations)
+            results.update(run_protocol_comparison(sim, args.iterations))
+            results.update(run_pattern_rate(sim))
+            if profile == "loopback":
+                results.update(run_reader_comparison(sim.port, args.iterations))
+                results.update(run_parser_comparison(args.iterations))
+        report["results"][profile] = results
+        print_table(profile, results)
+
+    if args.ws:
+        results = {}
+        for clients in map(int, args.ws_clients.split(",")):
+            results[f"ws.toggle x{clients} clients"] = run_ws_load(args.ws, clients, args.ws_toggles)
+        report["results"]["websocket"] = results
+        print_table("websocket", results)
+
+    if args.scheduler_jobs:
+        results = {f"scheduler x{args.scheduler_jobs} jobs": run_scheduler_load(
+            args.scheduler_jobs, args.scheduler_boards)}
+        report["results"]["scheduler"] = results
+        print_table("scheduler", results)
+
+    if args.startup:
+        results = run_startup(args.startup.split(","))
+        report["results"]["startup"] = results
+        print_table("startup", results)
+
+    if args.chunks:
+        results = run_chunk_io(sorted(glob.glob(args.chunks)))
+        report["results"]["chunks"] = results
+        print_table("chunks", results)
+
+    if args.gesture:
+        paths = sorted(glob.glob(args.gesture))
+        results = run_gesture_overhead(paths)
+        if args.gesture_processes:
+            results.update(run_gesture_scaling(paths, [int(n) for n in args.gesture_processes.split(",")]))
+        report["results"]["gesture"] = results
+        print_table("gesture", results)
+        report["sampler"] = sampling = run_sampler_accuracy(paths)
+        if sampling:
+            print(f"\n{'frame sampling':<34} {'inferred/chunk':>15} {'accuracy':>9}")
+            for case, r in sampling.items():
+                print(f"{case:<34} {r['inferred_per_chunk']:>15.1f} {r['accuracy']:>9.2%}")
+        report["gesture_commands"] = commands = run_gesture_commands(paths)
+        if commands:
+            print(f"\nPin writes per minute of video: {commands['per_chunk_reset_per_minute']} "
+                  f"resetting finger state per chunk, {commands['carried_per_minute']} carrying it over")
+
+    if args.compare:
+        with open(args.compare) as fp:
+            print_comparison(json.load(fp), report)
+    if args.out:
+        with open(args.out, "w") as fp:
+            json.dump(report, fp, indent=2)
+        print(f"\nSaved results to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Compact binary framing for the ESP32 pin protocol, negotiated per connection.
+
+The client sends the text line "BIN1"; a board that supports binary mode
+replies "BIN1 OK" and switches the connection over. Older firmware answers
+with its usual "Invalid format" line and the client stays on text.
+
+Every request is an opcode u8 followed by fixed-size arguments, and every
+reply has a fixed size per opcode, so no delimiters are needed:
+
+    OP_SET      pin u8, state u8       -> status u8
+    OP_GETALL   0 u8, 0 u8             -> levels u16, reported u16, temperature f32, humidity f32
+    OP_SETMASK  mask u16, values u16   -> status u8 (all masked pins switch together)
+    OP_PULSE    pin u8, state u8, ms u16 -> status u8 (the board reverts the pin itself)
+    OP_TEXT     0 u8, 0 u8             -> status u8, then the connection is back in text mode
+
+All fields are little-endian. Bit i of every mask is ALLOWED_PINS[i];
+a pin the board did not report (the DHT pin) has its reported bit clear.
+"""
+import struct
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+from interactor import ALLOWED_PINS, PinSnapshot, validate_pin_state
+
+HANDSHAKE = b"BIN1\n"
+HANDSHAKE_OK = "BIN1 OK"
+
+OP_SET = 0x01
+OP_GETALL = 0x02
+OP_SETMASK = 0x03
+OP_PULSE = 0x04
+OP_TEXT = 0x7F
+
+STATUS_OK = 0x00
+STATUS_INVALID = 0x01
+STATUS_UNKNOWN_OP = 0x02
+
+# Same wording as the text replies, so callers can keep checking `"OK" in response`
+STATUS_TEXT = {
+    STATUS_OK: "OK",
+    STATUS_INVALID: "Invalid pin or state",
+    STATUS_UNKNOWN_OP: "Unknown opcode",
+}
+
+REQUEST = struct.Struct("<BBB")
+MASK_REQUEST = struct.Struct("<BHH")
+PULSE_REQUEST = struct.Struct("<BBBH")
+# Bytes per request by opcode; anything else is a 3-byte REQUEST
+REQUEST_SIZES = {OP_SETMASK: MASK_REQUEST.size, OP_PULSE: PULSE_REQUEST.size}
+STATUS = struct.Struct("<B")
+SNAPSHOT = struct.Struct("<HHff")
+
+GETALL_REQUEST = REQUEST.pack(OP_GETALL, 0, 0)
+TEXT_REQUEST = REQUEST.pack(OP_TEXT, 0, 0)
+
+# Every valid write is one of 2 * len(ALLOWED_PINS) frames; build them once
+_SET_FRAMES = {(pin, state): REQUEST.pack(OP_SET, pin, state)
+               for pin in ALLOWED_PINS for state in (0, 1)}
+
+# levels/reported masks -> PinSnapshot level bytes, memoised like the text parser
+_LEVELS_CACHE: Dict[bytes, bytes] = {}
+_LEVELS_CACHE_MAX = 1024
+
+
+def encode_set(pin: int, state: int) -> bytes:
+    validate_pin_state(pin, state)
+    return _SET_FRAMES[(pin, state)]
+
+
+def encode_sets(commands: Iterable[Tuple[int, int]]) -> bytes:
+    """Frames for already validated (pin, state) pairs."""
+    return b"".join([_SET_FRAMES[command] for command in commands])
+
+
+def encode_mask(mask: int, values: int) -> bytes:
+    return MASK_REQUEST.pack(OP_SETMASK, mask, values)
+
+
+def encode_pulse(pin: int, state: int, duration_ms: int) -> bytes:
+    return PULSE_REQUEST.pack(OP_PULSE, pin, state, duration_ms)
+
+
+def decode_status(data: bytes) -> str:
+    code = data[0]
+    return STATUS_TEXT.get(code, f"Error {code}")
+
+
+def encode_snapshot(pins: Dict[int, int], temperature: float, humidity: float) -> bytes:
+    """GETALL reply for {pin: level}; pins not in the dict are marked unreported."""
+    levels = reported = 0
+    for i, pin in enumerate(ALLOWED_PINS):
+        if pin in pins:
+            reported |= 1 << i
+            if pins[pin]:
+                levels |= 1 << i
+    return SNAPSHOT.pack(levels, reported, temperature, humidity)
+
+
+def decode_snapshot(data: bytes) -> PinSnapshot:
+    masks = bytes(data[:4])
+    levels = _LEVELS_CACHE.get(masks)
+    if levels is None:
+        level_bits, reported = struct.unpack_from("<HH", masks)
+        levels = bytes((level_bits >> i) & 1 if (reported >> i) & 1 else 0xFF
+                       for i in range(len(ALLOWED_PINS)))
+        if len(_LEVELS_CACHE) < _LEVELS_CACHE_MAX:
+            _LEVELS_CACHE[masks] = levels
+    _, _, temperature, humidity = SNAPSHOT.unpack(data)
+    return PinSnapshot(array("b", levels), temperature, humidity)
+
+
+class BinaryCodec:
+    """Binary framing for ESP32Interactor; the counterpart of interactor.TextCodec."""
+
+    name = "binary"
+    getall = GETALL_REQUEST
+
+    def __init__(self, esp):
+        self.esp = esp
+
+    def encode_sets(self, commands: List[Tuple[int, int]]) -> bytes:
+        return encode_sets(commands)
+
+    def encode_mask(self, mask: int, values: int) -> bytes:
+        return encode_mask(mask, values)
+
+    def encode_pulse(self, pin: int, state: int, duration_ms: int) -> bytes:
+        return encode_pulse(pin, state, duration_ms)
+
+    def read_status(self) -> str:
+        return decode_status(self.esp._read_exact(STATUS.size))
+
+    def read_snapshot(self) -> PinSnapshot:
+        return decode_snapshot(self.esp._read_exact(SNAPSHOT.size))
@@ -0,0 +1,91 @@
+"""Uploaded video chunks kept in memory instead of uploads/.
+
+cv2.VideoCapture only opens paths, so a MemoryChunk lends the decoder an
+in-memory file for as long as it takes to open it: a memfd on Linux
+(/proc/self/fd/N), else a file on a tmpfs such as /dev/shm, else (no tmpfs)
+an ordinary temporary file.
+
+    chunk = MemoryChunk("live_chunk_3.webm", request.files["video"].read())
+    with chunk_path(chunk) as path:
+        cap = cv2.VideoCapture(path)
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, Optional, Union
+
+TMPFS_DIRS = ("/dev/shm", "/run/shm")
+
+
+def _tmpfs_dir() -> Optional[str]:
+    for path in TMPFS_DIRS:
+        if os.path.isdir(path) and os.access(path, os.W_OK):
+            return path
+    return None
+
+
+def backend() -> str:
+    """Where MemoryChunk.path() puts the bytes: "memfd", "tmpfs" or "disk"."""
+    if hasattr(os, "memfd_create") and os.path.isdir("/proc/self/fd"):
+        return "memfd"
+    return "tmpfs" if _tmpfs_dir() else "disk"
+
+
+def _write_all(fd: int, data: bytes):
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+class MemoryChunk:
+    """An uploaded chunk's bytes; `name` is only for logs and the upload reply."""
+
+    __slots__ = ("name", "data")
+
+    def __init__(self, name: str, data: bytes):
+        self.name = name
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __str__(self):
+        return self.name
+
+    @contextmanager
+    def path(self) -> Iterator[str]:
+        """A path the decoder can open; valid only inside the `with` block.
+
+        Files opened through it stay readable after the block ends (the
+        memfd or unlinked tmpfs file lives until its last descriptor closes).
+        """
+        if backend() == "memfd":
+            fd = os.memfd_create(self.name, os.MFD_CLOEXEC)
+            try:
+                _write_all(fd, self.data)
+                yield f"/proc/self/fd/{fd}"
+            finally:
+                os.close(fd)
+            return
+
+        # Keep the extension: FFmpeg guesses the container from it
+        suffix = os.path.splitext(self.name)[1]
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=_tmpfs_dir())
+        try:
+            try:
+                _write_all(fd, self.data)
+            finally:
+                os.close(fd)
+            yield path
+        finally:
+            os.remove(path)
+
+
+@contextmanager
+def chunk_path(video: Union[str, MemoryChunk]) -> Iterator[str]:
+    """Path for a chunk that is either already a file or a MemoryChunk."""
+    if isinstance(video, MemoryChunk):
+        with video.path() as path:
+            yield path
+    else:
+        yield video
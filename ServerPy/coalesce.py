@@ -0,0 +1,158 @@
+import threading
+import time
+from typing import Dict, Literal, Optional
+
+from interactor import logger, validate_pin_state
+
+COALESCE_WINDOW = 0.05  # seconds
+MIN_PIN_INTERVAL = 0.0  # seconds
+
+
+class CoalescingWriter:
+    """Opt-in write coalescing in front of an ESP32Interactor (or CommandMultiplexer).
+
+    set_pin_state() only records the wanted state and returns. A flusher
+    thread waits `window` seconds after the first pending write, then:
+      * keeps only the last state per pin (last write wins),
+      * drops writes matching the board's state: acknowledged pin_states,
+        or the batch still being sent when the write arrived,
+      * holds back pins written less than `min_interval` ago,
+    and sends what is left as one pipelined set_pin_states() batch.
+    """
+
+    def __init__(self, esp, window: float = COALESCE_WINDOW,
+                 min_interval: float = MIN_PIN_INTERVAL):
+        self.esp = esp
+        self.window = window
+        self.min_interval = min_interval
+        self._pending: Dict[int, int] = {}
+        self._last_sent: Dict[int, float] = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._inflight: Dict[int, int] = {}  # batch being sent, pin -> state
+        self.requested = 0
+        self.merged = 0
+        self.suppressed = 0
+        self.sent = 0
+        self.failed = 0
+        self._flusher = threading.Thread(target=self._run, name="esp32-coalesce", daemon=True)
+        self._flusher.start()
+
+    @property
+    def pin_states(self) -> Dict[int, Literal[0, 1]]:
+        return self.esp.pin_states
+
+    def set_pin_state(self, pin: int, state: Literal[0, 1]):
+        """Queue a pin write; it reaches the board on the next flush, if still needed."""
+        validate_pin_state(pin, state)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Coalescing writer is closed.")
+            self.requested += 1
+            if pin in self._pending:
+                self.merged += 1
+            elif self._inflight.get(pin, self.esp.pin_states.get(pin)) == state:
+                self.suppressed += 1
+                return
+            self._pending[pin] = state
+            self._cond.notify()
+
+    def set_pin_states(self, commands):
+        items = commands.items() if isinstance(commands, dict) else commands
+        for pin, state in items:
+            self.set_pin_state(pin, state)
+
+    def get_all_pin_states(self):
+        return self.esp.get_all_pin_states()
+
+    def _take_due(self, now: float):
+        """Pop the writes that should go out now; return (batch, seconds until the next one)."""
+        batch = []
+        next_due: Optional[float] = None
+        acked = self.esp.pin_states
+        for pin, state in list(self._pending.items()):
+            if acked.get(pin) == state:
+                del self._pending[pin]
+                self.suppressed += 1
+                continue
+            due = self._last_sent.get(pin, float("-inf")) + self.min_interval
+            if due > now:
+                next_due = due if next_due is None else min(next_due, due)
+                continue
+            del self._pending[pin]
+            batch.append((pin, state))
+        return batch, (None if next_due is None else next_due - now)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._pending:
+                    return
+                closing = self._closed
+            if not closing:
+                # Let the burst finish arriving before deciding what to send
+                time.sleep(self.window)
+            self._flush_once()
+            with self._cond:
+                if closing:
+                    # Whatever min_interval still holds back goes out now
+                    self.min_interval = 0.0
+
+    def _flush_once(self):
+        with self._cond:
+            batch, wait = self._take_due(time.monotonic())
+            self._inflight = dict(batch)
+        if batch:
+            try:
+                self.esp.set_pin_states(batch)
+            except Exception as e:
+                with self._cond:
+                    self.failed += len(batch)
+                    self._inflight = {}
+                logger.warning(f"Coalesced write of {len(batch)} pins failed: {e}")
+                return
+            with self._cond:
+                now = time.monotonic()
+                for pin, _ in batch:
+                    self._last_sent[pin] = now
+                self.sent += len(batch)
+                self._inflight = {}
+        elif wait:
+            with self._cond:
+                self._cond.wait(wait)
+
+    def flush(self, timeout: float = 5.0):
+        """Block until everything queued so far has been sent or dropped."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify()
+        while time.monotonic() < deadline:
+            with self._cond:
+                if not self._pending and not self._inflight:
+                    return
+            time.sleep(self.window / 2 or 0.001)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "requested": self.requested,
+                "merged": self.merged,
+                "suppressed": self.suppressed,
+                "sent": self.sent,
+                "failed": self.failed,
+                "pending": len(self._pending),
+                "saved": self.requested - self.sent - self.failed - len(self._pending),
+            }
+
+    def close(self, timeout: float = 5.0):
+        """Send what is still pending, then stop the flusher."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._flusher.join(timeout)
+
+    def disconnect(self):
+        self.close()
+        self.esp.disconnect()
@@ -0,0 +1,282 @@
+import logging
+import random
+import select
+import socket
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger("ESP32Interactor")
+
+CONNECT_TIMEOUT = 2
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+PROBE_INTERVAL = 5.0
+# TCP keepalive on the board socket: a board that silently left Wi-Fi sends no
+# FIN or RST, so only unanswered keepalives (idle + interval * count) reveal it
+KEEPALIVE_IDLE = 5
+KEEPALIVE_INTERVAL = 2
+KEEPALIVE_COUNT = 3
+
+
+class DeviceUnavailable(ConnectionError):
+    """Raised immediately while the circuit breaker says the board is down."""
+
+
+class Backoff:
+    """Exponential backoff with full jitter: delay = uniform(0, min(cap, base * 2**n))."""
+
+    def __init__(self, base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP):
+        self.base = base
+        self.cap = cap
+        self.attempts = 0
+
+    def next_delay(self) -> float:
+        ceiling = min(self.cap, self.base * (2 ** self.attempts))
+        self.attempts += 1
+        return random.uniform(0, ceiling)
+
+    def reset(self):
+        self.attempts = 0
+
+
+class CircuitBreaker:
+    """closed -> open after `threshold` consecutive failures; open -> half-open once
+    `retry_at` passes; half-open lets one attempt through and closes on success."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, threshold: int):
+        self.threshold = max(1, threshold)
+        self.state = self.CLOSED
+        self.failures = 0
+        self.retry_at = 0.0
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN and time.monotonic() >= self.retry_at:
+            self.state = self.HALF_OPEN
+        return self.state != self.OPEN
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self, retry_in: float):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+            self.state = self.OPEN
+            self.retry_at = time.monotonic() + retry_in
+
+
+def _enable_keepalive(sock: socket.socket):
+    """Turn on TCP keepalive, with short timings where the platform lets us set them."""
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    # TCP_KEEPIDLE is TCP_KEEPALIVE on macOS; Windows has neither option here
+    idle = getattr(socket, "TCP_KEEPIDLE", getattr(socket, "TCP_KEEPALIVE", None))
+    for option, value in ((idle, KEEPALIVE_IDLE),
+                          (getattr(socket, "TCP_KEEPINTVL", None), KEEPALIVE_INTERVAL),
+                          (getattr(socket, "TCP_KEEPCNT", None), KEEPALIVE_COUNT)):
+        if option is not None:
+            try:
+                sock.setsockopt(socket.IPPROTO_TCP, option, value)
+            except OSError:
+                pass
+
+
+class ConnectionManager:
+    """Owns the TCP socket to one board.
+
+    acquire() either returns a connected socket, makes a single bounded
+    connect attempt, or raises DeviceUnavailable straight away while the
+    breaker is open. Reconnects happen on a background thread with
+    jittered exponential backoff, which also probes an idle connection so
+    a board that closed it, or (through TCP keepalive) silently dropped off
+    Wi-Fi, is noticed before the next command.
+    """
+
+    def __init__(self, host: str, port: int, failure_threshold: int = 3,
+                 connect_timeout: float = CONNECT_TIMEOUT, io_timeout: float = 5,
+                 backoff: Optional[Backoff] = None, background: bool = True,
+                 probe_interval: float = PROBE_INTERVAL):
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.io_timeout = io_timeout
+        self.backoff = backoff or Backoff()
+        self.breaker = CircuitBreaker(failure_threshold)
+        self.background = background
+        self.probe_interval = probe_interval
+        self.sock: Optional[socket.socket] = None
+
+        self.connects = 0
+        self.connect_failures = 0
+        self.fast_failures = 0
+        self.drops = 0
+        self._disconnected_total = 0.0
+        self._down_since: Optional[float] = None
+
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._wanted = False
+        self._monitor: Optional[threading.Thread] = None
+
+    # -- connection lifecycle ------------------------------------------------
+
+    def _open(self) -> socket.socket:
+        sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+        sock.settimeout(self.io_timeout)
+        _enable_keepalive(sock)
+        return sock
+
+    def _attempt(self) -> bool:
+        """One connect attempt; updates breaker, backoff and counters."""
+        try:
+            logger.info(f"Connecting to ESP32 at {self.host}:{self.port}...")
+            sock = self._open()
+        except OSError as e:
+            with self._lock:
+                self.connect_failures += 1
+                if self._down_since is None:
+                    self._down_since = time.monotonic()
+                self.breaker.record_failure(self.backoff.next_delay())
+            logger.warning(f"Failed to connect to ESP32: {e}")
+            return False
+
+        with self._lock:
+            if self.sock is not None:
+                # Lost a race with the other connector; keep the socket we have
+                sock.close()
+                return True
+            self.sock = sock
+            self.connects += 1
+            self.breaker.record_success()
+            self.backoff.reset()
+            if self._down_since is not None:
+                self._disconnected_total += time.monotonic() - self._down_since
+                self._down_since = None
+        logger.info("Connection established.")
+        return True
+
+    def acquire(self) -> socket.socket:
+        """Return a connected socket or fail fast."""
+        with self._lock:
+            self._wanted = True
+            if self.sock is not None:
+                return self.sock
+            if not self.breaker.allow() or (self.background and self._reconnecting()):
+                self.fast_failures += 1
+                raise DeviceUnavailable(
+                    f"ESP32 at {self.host}:{self.port} is unavailable "
+                    f"(circuit {self.breaker.state}, reconnecting in background)"
+                )
+        if not self._attempt():
+            self._ensure_monitor()
+            raise DeviceUnavailable(f"Could not connect to ESP32 at {self.host}:{self.port}")
+        self._ensure_monitor()
+        return self.sock
+
+    def invalidate(self):
+        """Drop a socket that failed mid-exchange and start reconnecting."""
+        with self._lock:
+            if self.sock is None:
+                return
+            self._close_sock()
+            self.drops += 1
+            if self._down_since is None:
+                self._down_since = time.monotonic()
+        logger.warning(f"Lost connection to ESP32 at {self.host}:{self.port}.")
+        self._ensure_monitor()
+        self._wake.set()
+
+    def close(self):
+        """Explicit disconnect: close the socket and stop background work."""
+        with self._lock:
+            self._wanted = False
+            had_sock = self.sock is not None
+            self._close_sock()
+            if self._down_since is not None:
+                self._disconnected_total += time.monotonic() - self._down_since
+                self._down_since = None
+        self._wake.set()
+        return had_sock
+
+    def _close_sock(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            finally:
+                self.sock = None
+
+    # -- background monitor --------------------------------------------------
+
+    def _reconnecting(self) -> bool:
+        """True while the monitor owns recovery from an unexpected failure."""
+        return (self._down_since is not None and self._monitor is not None
+                and self._monitor.is_alive())
+
+    def _ensure_monitor(self):
+        if not self.background:
+            return
+        with self._lock:
+            if self._monitor is not None and self._monitor.is_alive():
+                return
+            self._monitor = threading.Thread(
+                target=self._run_monitor, name=f"esp32-conn-{self.host}", daemon=True
+            )
+            self._monitor.start()
+
+    def _run_monitor(self):
+        while self._wanted:
+            self._wake.clear()
+            if self.sock is None and self._down_since is not None:
+                delay = max(0.0, self.breaker.retry_at - time.monotonic())
+                if self.breaker.state == CircuitBreaker.CLOSED:
+                    delay = self.backoff.next_delay()
+                if self._wake.wait(delay) or not self._wanted:
+                    continue
+                with self._lock:
+                    if self.sock is not None or not self._wanted:
+                        continue
+                    self.breaker.allow()
+                self._attempt()
+            else:
+                self._wake.wait(self.probe_interval)
+                if self._wanted and self.sock is not None and not self.probe():
+                    self.invalidate()
+
+    def probe(self) -> bool:
+        """Cheap liveness check: a readable socket with nothing to read was closed by the peer,
+        and one whose keepalives went unanswered reports an error."""
+        sock = self.sock
+        if sock is None:
+            return False
+        try:
+            readable, _, _ = select.select([sock], [], [], 0)
+            if not readable:
+                return True
+            return bool(sock.recv(1, socket.MSG_PEEK))
+        except (OSError, ValueError):
+            return False
+
+    # -- stats ---------------------------------------------------------------
+
+    @property
+    def disconnected_seconds(self) -> float:
+        with self._lock:
+            total = self._disconnected_total
+            if self._down_since is not None:
+                total += time.monotonic() - self._down_since
+            return total
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.sock is not None,
+            "circuit": self.breaker.state,
+            "connects": self.connects,
+            "connect_failures": self.connect_failures,
+            "fast_failures": self.fast_failures,
+            "drops": self.drops,
+            "disconnected_seconds": round(self.disconnected_seconds, 3),
+        }
@@ -1,7 +1,9 @@
 import discord
 from discord.ext import commands
 from discord.ui import Button, View
-from interactor import ESP32Interactor
+from async_interactor import AsyncESP32Interactor
+from lazy import LazyInteractor
+from status_cache import AsyncStatusCache
 import logging
 from pathlib import Path
 
@@ -9,8 +11,9 @@ from pathlib import Path
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# ESP setup
-esp = ESP32Interactor()
+# ESP setup (status reads from every open control panel share one GETALL);
+# built on the first command, not at import, with discovery off the event loop
+esp = LazyInteractor(lambda: AsyncStatusCache(AsyncESP32Interactor()))
 
 # Device and pin mapping
 DEVICE_PINS = {
@@ -29,12 +32,12 @@ class DeviceControlView(View):
         super().__init__(timeout=300)  # 5 minute timeout
         self.user_id = user_id
         self.device_states = {}
-        self.update_buttons()
     
-    def update_buttons(self):
+    async def update_buttons(self):
         """Update button states based on current device states"""
         try:
-            states = esp.get_all_pin_states()
+            board = await esp.get_async()
+            states = await board.get_all_pin_states()
             for device, pin in DEVICE_PINS.items():
                 self.device_states[device] = states.get(pin, 0)
         except Exception as e:
@@ -77,7 +80,7 @@ class DeviceControlView(View):
     @discord.ui.button(label="🔄 Refresh Status", style=discord.ButtonStyle.primary, row=1)
     async def refresh_button(self, interaction: discord.Interaction, button: Button):
         await interaction.response.defer()
-        self.update_buttons()
+        await self.update_buttons()
         
         # Update button labels and styles
         for item in self.children:
@@ -104,7 +107,8 @@ class DeviceControlView(View):
             new_state = 1 if current_state == 0 else 0
             
             # Control the device
-            esp.set_pin_state(pin, new_state)
+            board = await esp.get_async()
+            await board.set_pin_state(pin, new_state)
             self.device_states[device] = new_state
             
             # Update button
@@ -166,8 +170,8 @@ class QuickActionView(View):
     @discord.ui.button(label="💡 All Lights ON", style=discord.ButtonStyle.success, row=0)
     async def all_on_button(self, interaction: discord.Interaction, button: Button):
         try:
-            for device, pin in DEVICE_PINS.items():
-                esp.set_pin_state(pin, 1)
+            board = await esp.get_async()
+            await board.set_pins({pin: 1 for pin in DEVICE_PINS.values()})
             await interaction.response.send_message("✅ All devices turned ON!", ephemeral=True)
         except Exception as e:
             await interaction.response.send_message(f"❌ Error: {e}", ephemeral=True)
@@ -175,8 +179,8 @@ class QuickActionView(View):
     @discord.ui.button(label="⚫ All Lights OFF", style=discord.ButtonStyle.secondary, row=0)
     async def all_off_button(self, interaction: discord.Interaction, button: Button):
         try:
-            for device, pin in DEVICE_PINS.items():
-                esp.set_pin_state(pin, 0)
+            board = await esp.get_async()
+            await board.set_pins({pin: 0 for pin in DEVICE_PINS.values()})
             await interaction.response.send_message("✅ All devices turned OFF!", ephemeral=True)
         except Exception as e:
             await interaction.response.send_message(f"❌ Error: {e}", ephemeral=True)
@@ -195,6 +199,7 @@ async def on_ready():
 async def control(ctx):
     """Open interactive control panel"""
     view = DeviceControlView(ctx.author.id)
+    await view.update_buttons()
     embed = view.create_status_embed()
     
     await ctx.send(
@@ -220,7 +225,8 @@ async def quick(ctx):
 async def status(ctx):
     """Check status of all devices"""
     try:
-        states = esp.get_all_pin_states()
+        board = await esp.get_async()
+        states = await board.get_all_pin_states()
         
         embed = discord.Embed(
             title="📊 Device Status",
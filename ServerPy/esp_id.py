@@ -1,17 +1,183 @@
-import subprocess
+import argparse
+import ipaddress
+import json
+import logging
+import os
 import re
+import socket
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger("ESP32Interactor")
+
+ESP_PORT = 1234
+PROBE_TIMEOUT = 0.5
+PROBE_WORKERS = 32
+CACHE_TTL = 300.0  # seconds a confirmed address is trusted without probing again
+CACHE_FILE = Path(os.environ.get("ESP32_HOSTS_CACHE", Path.home() / ".cache" / "esp32_hosts.json"))
+# Only neighbours under this prefix are probed: the board joins the laptop's
+# hotspot (192.168.x.x), and skipping docker/VPN neighbours saves probes.
+# Set ESP32_SUBNET="" to probe every neighbour.
+SUBNET_PREFIX = os.environ.get("ESP32_SUBNET", "192.")
+
+# probe() results
+CONFIRMED = "confirmed"  # answered GETALL like bootLoader.ino
+BUSY = "busy"  # accepted but stayed silent: a board already serving another client
+REJECTED = "rejected"  # answered with something else: not a board
+
+# `arp -a` output on Windows ("192.168.137.230  aa-bb-cc-dd-ee-ff  dynamic")
+# and on macOS/BSD ("? (192.168.1.7) at aa:bb:cc:dd:ee:ff on en0")
+_ARP_LINE = re.compile(r"(\d+\.\d+\.\d+\.\d+)\)?\s+(?:at\s+)?([0-9a-fA-F]{2}(?:[:-][0-9a-fA-F]{2}){5})")
+_ARP_COMPLETE = 0x2
+
+# {port: (monotonic expiry, hosts)}; saves even the cache file read on repeat lookups
+_memo: Dict[int, tuple] = {}
+
+
+def _usable(ip: str) -> bool:
+    try:
+        addr = ipaddress.IPv4Address(ip)
+    except ValueError:
+        return False
+    return not (addr.is_multicast or addr.is_loopback or addr.is_unspecified
+                or ip.endswith((".255", ".254")))
+
+
+def read_arp_table() -> List[str]:
+    """IPv4 neighbours with a resolved MAC address, in table order."""
+    try:
+        with open("/proc/net/arp") as fp:
+            next(fp)  # header
+            rows = [line.split() for line in fp]
+        ips = [row[0] for row in rows
+               if len(row) >= 4 and int(row[2], 16) & _ARP_COMPLETE and row[3] != "00:00:00:00:00:00"]
+    except OSError:
+        # No procfs (Windows, macOS): ask the arp tool, without a shell
+        try:
+            output = subprocess.run(["arp", "-a"], capture_output=True, text=True, timeout=5).stdout
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"Could not read the ARP table: {e}")
+            return []
+        ips = [m.group(1) for m in map(_ARP_LINE.search, output.splitlines()) if m]
+    return [ip for ip in dict.fromkeys(ips) if _usable(ip) and ip.startswith(SUBNET_PREFIX)]
+
+
+def probe(ip: str, port: int = ESP_PORT, timeout: float = PROBE_TIMEOUT) -> Optional[str]:
+    """CONFIRMED, BUSY or REJECTED for a host listening on `port`; None if nothing listens.
+
+    The firmware serves one client at a time, so a board that is already
+    connected accepts the probe but never answers: silence is BUSY. Any
+    reply that is not GETALL output means a different service: REJECTED.
+    """
+    try:
+        sock = socket.create_connection((ip, port), timeout=timeout)
+    except OSError:
+        return None
+    reply = b""
+    with sock:
+        try:
+            sock.sendall(b"GETALL\n")
+            while b"\n" not in reply:
+                chunk = sock.recv(256)
+                if not chunk:
+                    break
+                reply += chunk
+        except OSError:
+            pass  # timed out or reset: judge by whatever arrived
+    if not reply:
+        return BUSY
+    return CONFIRMED if b"TEMP:" in reply and b"HUM:" in reply else REJECTED
+
+
+def _load_cache(port: int) -> Optional[Tuple[float, List[str]]]:
+    """(seconds left to live, hosts) from the cache file, if still fresh."""
+    try:
+        with open(CACHE_FILE) as fp:
+            entry = json.load(fp).get(str(port))
+        remaining = CACHE_TTL - (time.time() - entry["found_at"])
+        hosts = entry["hosts"]
+    except (OSError, ValueError, AttributeError, KeyError, TypeError):
+        return None
+    if remaining <= 0 or not hosts:
+        return None
+    return remaining, hosts
+
+
+def _save_cache(port: int, hosts: List[str]):
+    try:
+        with open(CACHE_FILE) as fp:
+            data = json.load(fp)
+        if not isinstance(data, dict):
+            data = {}
+    except (OSError, ValueError):
+        data = {}
+    data[str(port)] = {"hosts": hosts, "found_at": time.time()}
+    try:
+        CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = CACHE_FILE.with_suffix(".tmp")
+        with open(tmp, "w") as fp:
+            json.dump(data, fp)
+        os.replace(tmp, CACHE_FILE)
+    except OSError as e:
+        logger.warning(f"Could not write ESP discovery cache {CACHE_FILE}: {e}")
+
+
+def discover(port: int = ESP_PORT, timeout: float = PROBE_TIMEOUT) -> Tuple[List[str], List[str]]:
+    """Probe every ARP neighbour's `port` at once; returns (confirmed, busy) addresses.
+
+    Hosts that answered with something other than GETALL output are left out.
+    """
+    candidates = read_arp_table()
+    if not candidates:
+        return [], []
+    with ThreadPoolExecutor(min(PROBE_WORKERS, len(candidates))) as pool:
+        results = list(pool.map(lambda ip: probe(ip, port, timeout), candidates))
+    confirmed = [ip for ip, result in zip(candidates, results) if result == CONFIRMED]
+    busy = [ip for ip, result in zip(candidates, results) if result == BUSY]
+    rejected = [ip for ip, result in zip(candidates, results) if result == REJECTED]
+    logger.info(f"ESP discovery: {len(candidates)} neighbours, confirmed {confirmed}, "
+                f"busy {busy}, rejected {rejected}")
+    return confirmed, busy
+
+
+def get_esp_ip(port: int = ESP_PORT, refresh: bool = False) -> List[str]:
+    """Addresses of ESP32 boards on the local network, best first.
+
+    Answers from memory, then from the on-disk cache, while younger than
+    CACHE_TTL; otherwise runs discover(). Results are cached only if at
+    least one board confirmed the handshake; busy addresses come last.
+    """
+    now = time.monotonic()
+    if not refresh:
+        memo = _memo.get(port)
+        if memo and memo[0] > now:
+            return list(memo[1])
+        cached = _load_cache(port)
+        if cached:
+            remaining, hosts = cached
+            _memo[port] = (now + remaining, hosts)
+            return list(hosts)
+
+    confirmed, busy = discover(port)
+    hosts = confirmed + busy
+    if confirmed:
+        _memo[port] = (now + CACHE_TTL, hosts)
+        _save_cache(port, hosts)
+    return hosts
+
+
+def forget(port: int = ESP_PORT):
+    """Drop cached addresses, e.g. after the board moved to a new DHCP lease."""
+    _memo.pop(port, None)
+    _save_cache(port, [])
 
-def get_esp_ip():
-    cmd = "arp -a"
-    output = subprocess.check_output(cmd, shell=True).decode()
-    devices = []
-    for line in output.splitlines():
-        match = re.search(r"(\d+\.\d+\.\d+\.\d+)\s+([\w-]{17}|[a-fA-F0-9:]{17}|[a-fA-F0-9:]{2}(?::[a-fA-F0-9]{2}){5})", line)
-        if match:
-            ip = match.group(1)
-            if ip.startswith("192") and not any([ip.endswith(i) for i in ["255","254"]]):
-                devices.append(ip)
-    return devices
 
 if __name__ == "__main__":
-    print(get_esp_ip())
+    parser = argparse.ArgumentParser(description="Find ESP32 boards on the local network")
+    parser.add_argument("--port", type=int, default=ESP_PORT)
+    parser.add_argument("--refresh", action="store_true", help="ignore the cache and probe again")
+    args = parser.parse_args()
+    print(get_esp_ip(args.port, args.refresh))
@@ -0,0 +1,116 @@
+import json
+import threading
+import time
+from typing import Callable, Dict, Iterator, Optional
+
+from interactor import logger
+
+# One shared poller, so board load does not grow with the number of dashboards;
+# with reads at most one interval old, outside changes show up within ~1 s
+POLL_INTERVAL = 0.5  # seconds between board reads while anyone is listening
+# An idle stream writes a comment this often, independent of polling: a vanished
+# client is only noticed when a write to it fails, and polling stops with the last one
+KEEPALIVE_SECS = 5.0
+RETRY_MS = 2000  # browser reconnect delay after the stream drops
+
+
+class _Subscriber:
+    __slots__ = ("pending", "wake")
+
+    def __init__(self, initial: Dict[str, int]):
+        self.pending = dict(initial)
+        self.wake = threading.Event()
+        if initial:
+            self.wake.set()
+
+
+class StatusBroadcaster:
+    """Fans device-state changes out to any number of Server-Sent Events clients.
+
+    One poller thread calls `read()` every `interval` seconds, but only while
+    at least one client is subscribed, so board traffic does not grow with
+    the number of open dashboards. Only changed devices are pushed. A slow
+    client never queues up history: its pending changes merge, last value wins.
+    `read()` should return {device: state} and report failures as -1 rather
+    than raising, the same way /status does.
+    """
+
+    def __init__(self, read: Callable[[], Dict[str, int]], interval: float = POLL_INTERVAL):
+        self.read = read
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._state: Dict[str, int] = {}
+        self._poller = None
+        self.polls = 0
+        self.published = 0
+
+    def subscribe(self) -> _Subscriber:
+        with self._lock:
+            sub = _Subscriber(self._state)
+            self._subscribers.add(sub)
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll, name="status-events", daemon=True)
+                self._poller.start()
+        return sub
+
+    def unsubscribe(self, sub: _Subscriber):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def publish(self, changes: Dict[str, int]):
+        """Push whatever in `changes` differs from the last known state, e.g. right after a write."""
+        with self._lock:
+            diff = {k: v for k, v in changes.items() if self._state.get(k) != v}
+            if not diff:
+                return
+            self._state.update(diff)
+            self.published += 1
+            for sub in self._subscribers:
+                sub.pending.update(diff)
+                sub.wake.set()
+
+    def take(self, sub: _Subscriber, timeout: Optional[float] = None) -> Optional[Dict[str, int]]:
+        """Wait for and return the subscriber's merged pending changes, or None on timeout."""
+        if not sub.wake.wait(timeout):
+            return None
+        with self._lock:
+            changes, sub.pending = sub.pending, {}
+            sub.wake.clear()
+        return changes
+
+    def _poll(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._poller = None
+                    return
+            try:
+                self.publish(self.read())
+                self.polls += 1
+            except Exception as e:
+                logger.warning(f"Status poll failed: {e}")
+            time.sleep(self.interval)
+
+    def stream(self) -> Iterator[str]:
+        """text/event-stream body for one client: current state first, then changes."""
+        sub = self.subscribe()
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            while True:
+                changes = self.take(sub, KEEPALIVE_SECS)
+                if changes is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {json.dumps(changes)}\n\n"
+        finally:
+            self.unsubscribe(sub)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "polling": self._poller is not None,
+                "polls": self.polls,
+                "published": self.published,
+            }
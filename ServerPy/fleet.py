@@ -0,0 +1,121 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from esp_id import get_esp_ip
+from interactor import ESP32Interactor, logger
+
+MAX_WORKERS = 64
+
+
+def _split_host(entry: str, default_port: int):
+    """Accept "ip" or "ip:port" so boards (or simulators) can share an address."""
+    host, sep, port = entry.rpartition(":")
+    if sep and port.isdigit():
+        return host, int(port)
+    return entry, default_port
+
+
+class FleetResult:
+    """Per-host outcome of a fleet-wide command."""
+
+    def __init__(self):
+        self.results: Dict[str, Any] = {}
+        self.errors: Dict[str, Exception] = {}
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def __repr__(self):
+        return f"FleetResult(ok={len(self.results)}, failed={sorted(self.errors)})"
+
+
+class DeviceFleet:
+    """One ESP32Interactor per board, with commands fanned out on a thread pool.
+
+    Boards are independent, so a sweep over N hosts costs roughly the
+    slowest single round trip instead of N of them. A per-host lock keeps
+    two overlapping sweeps from sharing one socket.
+    """
+
+    def __init__(self, hosts: Optional[Iterable[str]] = None, port: int = 1234,
+                 max_workers: int = MAX_WORKERS, retry_count: int = 1):
+        if hosts is None:
+            hosts = get_esp_ip(port)
+        hosts = list(dict.fromkeys(hosts))
+        if not hosts:
+            raise ValueError("Could not find esp on our hotspot")
+        self.devices: Dict[str, ESP32Interactor] = {
+            host: ESP32Interactor(*_split_host(host, port), retry_count) for host in hosts
+        }
+        self._locks = {host: threading.Lock() for host in hosts}
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(hosts))),
+            thread_name_prefix="fleet",
+        )
+
+    @property
+    def hosts(self) -> List[str]:
+        return list(self.devices)
+
+    def _run(self, host: str, fn: Callable[[ESP32Interactor], Any]):
+        with self._locks[host]:
+            esp = self.devices[host]
+            try:
+                return fn(esp)
+            except Exception:
+                # Drop the socket so the next command starts from a clean stream;
+                # under the host's lock, so no other sweep is mid-exchange on it
+                esp.disconnect()
+                raise
+
+    def _fan_out(self, fn: Callable[[ESP32Interactor], Any],
+                 hosts: Optional[Iterable[str]] = None) -> FleetResult:
+        targets = self.hosts if hosts is None else list(hosts)
+        unknown = [h for h in targets if h not in self.devices]
+        if unknown:
+            raise ValueError(f"Unknown hosts: {unknown}")
+
+        result = FleetResult()
+        futures = {self._pool.submit(self._run, host, fn): host for host in targets}
+        for future in as_completed(futures):
+            host = futures[future]
+            try:
+                result.results[host] = future.result()
+            except Exception as e:
+                logger.warning(f"Fleet command failed on {host}: {e}")
+                result.errors[host] = e
+        return result
+
+    def connect(self, hosts: Optional[Iterable[str]] = None) -> FleetResult:
+        return self._fan_out(lambda esp: esp.connect(), hosts)
+
+    def set_pin_state(self, pin: int, state: int,
+                      hosts: Optional[Iterable[str]] = None) -> FleetResult:
+        """Set one pin on every (or the given) board."""
+        return self._fan_out(lambda esp: esp.set_pin_state(pin, state), hosts)
+
+    def set_pin_states(self, commands, hosts: Optional[Iterable[str]] = None) -> FleetResult:
+        """Pipeline the same batch of pin commands to every (or the given) board."""
+        commands = list(commands.items()) if isinstance(commands, dict) else list(commands)
+        return self._fan_out(lambda esp: esp.set_pin_states(commands), hosts)
+
+    def get_all_pin_states(self, hosts: Optional[Iterable[str]] = None) -> FleetResult:
+        """GETALL status sweep across the fleet."""
+        return self._fan_out(lambda esp: esp.get_all_pin_states(), hosts)
+
+    def disconnect(self):
+        for host, esp in self.devices.items():
+            with self._locks[host]:
+                esp.disconnect()
+
+    def close(self):
+        self.disconnect()
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
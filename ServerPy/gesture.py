@@ -1,6 +1,7 @@
 import cv2
 import mediapipe as mp
 from interactor import ESP32Interactor
+from coalesce import CoalescingWriter
 import time
 
 # Maps: thumb to pinky → pin list
@@ -12,6 +13,10 @@ FINGER_TO_PIN = {
     4: 25,   # Pinky
 }
 
+# Merge per-frame pin writes before they reach the board; None sends every write
+COALESCE_WINDOW = 0.05  # seconds
+MIN_PIN_INTERVAL = 0.1  # seconds between writes to the same pin
+
 mp_hands = mp.solutions.hands
 mp_drawing = mp.solutions.drawing_utils
 
@@ -48,6 +53,8 @@ def get_finger_states(hand_landmarks) -> list[int]:
 def gesture():
     cap = cv2.VideoCapture(0)
     esp = ESP32Interactor("192.168.137.230")
+    if COALESCE_WINDOW is not None:
+        esp = CoalescingWriter(esp, COALESCE_WINDOW, MIN_PIN_INTERVAL)
     last_state = [0, 0, 0, 0, 0]  # Store previous finger states
 
     with mp_hands.Hands(static_image_mode=False, max_num_hands=1, min_detection_confidence=0.6) as hands:
@@ -84,4 +91,5 @@ def gesture():
             cv2.destroyAllWindows()
             esp.disconnect()
 
-gesture()
\ No newline at end of file
+if __name__ == "__main__":
+    gesture()
\ No newline at end of file
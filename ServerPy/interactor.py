@@ -1,8 +1,11 @@
 import socket
 import logging
-from typing import Literal, Optional, Dict
+import math
 import time
+from array import array
+from typing import Callable, Literal, Optional, Dict, Iterable, List, Tuple, Union
 from esp_id import get_esp_ip
+from connection import ConnectionManager
 
 # Setup logging
 logging.basicConfig(
@@ -13,82 +16,352 @@ logger = logging.getLogger("ESP32Interactor")
 
 RETRY_SECS = 2
 SOCKET_TIMEOUT = 5
+RECV_BUFFER_SIZE = 4096
 
 ALLOWED_PINS = [13, 12, 14, 27, 26, 25, 33, 32, 35, 34]
+MAX_PULSE_MS = 65535  # the binary protocol carries the duration as u16
 
 
+def validate_pin_state(pin: int, state: int):
+    """Raise ValueError unless the command is one the firmware accepts."""
+    if pin not in ALLOWED_PINS:
+        raise ValueError(f"Pin {pin} is not allowed.")
+
+    if state not in (0, 1):
+        raise ValueError("State must be 0 or 1.")
+
+
+def validate_pulse(pin: int, state: int, duration_ms: int):
+    validate_pin_state(pin, state)
+    if not isinstance(duration_ms, int) or not 1 <= duration_ms <= MAX_PULSE_MS:
+        raise ValueError(f"Pulse duration must be 1..{MAX_PULSE_MS} ms.")
+
+
+def normalize_commands(
+    commands: Union[Dict[int, int], Iterable[Tuple[int, int]]],
+) -> List[Tuple[int, int]]:
+    """Turn a {pin: state} dict or (pin, state) pairs into a validated list."""
+    if isinstance(commands, dict):
+        commands = list(commands.items())
+    else:
+        commands = list(commands)
+    for pin, state in commands:
+        validate_pin_state(pin, state)
+    return commands
+
+
+def encode_commands(commands: List[Tuple[int, int]]) -> bytes:
+    return "".join(f"{pin} {state}\n" for pin, state in commands).encode()
+
+
+def pin_mask(commands: List[Tuple[int, int]]) -> Tuple[int, int]:
+    """(mask, values) for a SETMASK write: bit i is ALLOWED_PINS[i]; the last state per pin wins."""
+    mask = values = 0
+    for pin, state in commands:
+        bit = 1 << _PIN_INDEX[pin]
+        mask |= bit
+        values = values | bit if state else values & ~bit
+    return mask, values
+
+
+def mask_commands(mask: int, values: int) -> List[Tuple[int, int]]:
+    """Inverse of pin_mask: the (pin, state) pairs a SETMASK writes."""
+    return [(pin, (values >> i) & 1) for i, pin in enumerate(ALLOWED_PINS) if (mask >> i) & 1]
+
+
+def mask_unsupported(response: str) -> bool:
+    """True if the board answered SETMASK (or PULSE) like firmware that predates it."""
+    return response.startswith(("Invalid format", "Unknown opcode"))
+
+
+# Slot of each pin in a PinSnapshot; the byte keys let the parser look pins up
+# straight from slices of the reply without converting them to int first
+_PIN_INDEX = {pin: i for i, pin in enumerate(ALLOWED_PINS)}
+_PIN_KEYS = {str(pin).encode(): i for i, pin in enumerate(ALLOWED_PINS)}
+
+# The pin section of a GETALL reply has at most 2**9 distinct values, so its
+# parsed levels are memoised and the common case is a single dict lookup
+_LEVELS_CACHE: Dict[bytes, bytes] = {}
+_LEVELS_CACHE_MAX = 1024
+
+
+class PinSnapshot:
+    """One GETALL reply.
+
+    Pin levels live in an array("b") indexed like ALLOWED_PINS, with -1 for pins
+    the board did not report (the DHT pin). Lookups take int pins and behave like
+    a read-only {pin: state} dict. temperature/humidity are NaN if the DHT read
+    failed; captured_at is the time.time() the reply was parsed.
+    """
+
+    __slots__ = ("states", "temperature", "humidity", "captured_at")
+
+    def __init__(self, states: array, temperature: float = math.nan,
+                 humidity: float = math.nan, captured_at: Optional[float] = None):
+        self.states = states
+        self.temperature = temperature
+        self.humidity = humidity
+        self.captured_at = time.time() if captured_at is None else captured_at
+
+    def get(self, pin: int, default=None):
+        idx = _PIN_INDEX.get(pin)
+        if idx is None or self.states[idx] < 0:
+            return default
+        return self.states[idx]
+
+    def __getitem__(self, pin: int) -> int:
+        value = self.get(pin)
+        if value is None:
+            raise KeyError(pin)
+        return value
+
+    def __contains__(self, pin) -> bool:
+        return self.get(pin) is not None
+
+    def __iter__(self):
+        return (pin for pin, value in zip(ALLOWED_PINS, self.states) if value >= 0)
+
+    def __len__(self) -> int:
+        return sum(1 for value in self.states if value >= 0)
+
+    def keys(self):
+        return list(self)
+
+    def items(self) -> List[Tuple[int, int]]:
+        return [(pin, value) for pin, value in zip(ALLOWED_PINS, self.states) if value >= 0]
+
+    def to_dict(self) -> Dict[int, int]:
+        return dict(self.items())
+
+    def with_states(self, commands: Iterable[Tuple[int, int]]) -> "PinSnapshot":
+        """Copy with acknowledged writes applied; sensor readings and captured_at are kept."""
+        states = array("b", self.states)
+        for pin, state in commands:
+            states[_PIN_INDEX[pin]] = state
+        return PinSnapshot(states, self.temperature, self.humidity, self.captured_at)
+
+    def __repr__(self):
+        return (f"PinSnapshot({self.to_dict()}, temperature={self.temperature}, "
+                f"humidity={self.humidity})")
+
+
+def _parse_levels(section: bytes) -> bytes:
+    """One pass over "13:0,12:1,...": the level of every pin, as bytes in ALLOWED_PINS order (0xff if unreported)."""
+    levels = bytearray(b"\xff" * len(ALLOWED_PINS))
+    pos = 0
+    end = len(section)
+    while pos < end:
+        colon = section.find(b":", pos)
+        if colon < 0:
+            break
+        comma = section.find(b",", colon)
+        if comma < 0:
+            comma = end
+        idx = _PIN_KEYS.get(section[pos:colon].strip())
+        if idx is not None:
+            levels[idx] = int(section[colon + 1:comma])
+        pos = comma + 1
+    return bytes(levels)
+
+
+def _parse_reading(value: bytes) -> float:
+    value = value.strip(b", \r\n")
+    return float(value) if value else math.nan
+
+
+def parse_pin_snapshot(data: Union[bytes, str]) -> PinSnapshot:
+    """Parse a GETALL reply ("13:0,12:1,...,TEMP:24.0,HUM:40.0") into a PinSnapshot.
+
+    Empty entries (a trailing comma) and unknown keys are skipped; a missing or
+    "nan" sensor value becomes NaN.
+    """
+    if isinstance(data, str):
+        data = data.encode()
+    sensors = data.find(b"TEMP:")
+    if sensors < 0:
+        sensors = len(data)
+    section = data[:sensors]
+    levels = _LEVELS_CACHE.get(section)
+    if levels is None:
+        levels = _parse_levels(section)
+        if len(_LEVELS_CACHE) < _LEVELS_CACHE_MAX:
+            _LEVELS_CACHE[section] = levels
+    temperature, _, humidity = data[sensors + 5:].partition(b",HUM:")
+    return PinSnapshot(array("b", levels), _parse_reading(temperature), _parse_reading(humidity))
+
+
+class TextCodec:
+    """Line protocol framing, what every firmware speaks.
+
+    A codec turns commands into request bytes and reads one reply per
+    command; binproto.BinaryCodec is the compact alternative.
+    """
+
+    name = "text"
+    getall = b"GETALL\n"
+
+    def __init__(self, esp: "ESP32Interactor"):
+        self.esp = esp
+
+    def encode_sets(self, commands: List[Tuple[int, int]]) -> bytes:
+        return encode_commands(commands)
+
+    def encode_mask(self, mask: int, values: int) -> bytes:
+        return f"SETMASK {mask} {values}\n".encode()
+
+    def encode_pulse(self, pin: int, state: int, duration_ms: int) -> bytes:
+        return f"PULSE {pin} {state} {duration_ms}\n".encode()
+
+    def read_status(self) -> str:
+        return self.esp._read_line()
+
+    def read_snapshot(self) -> PinSnapshot:
+        return parse_pin_snapshot(self.esp._read_frame())
+
+
+# build(codec) -> (request bytes, one reader per expected reply)
+ExchangeBuilder = Callable[[TextCodec], Tuple[bytes, List[Callable[[], object]]]]
+
 
 class ESP32Interactor:
-    def __init__(self, host: str="", port: int = 1234, retry_count: int = 10):
+    def __init__(self, host: str="", port: int = 1234, retry_count: int = 3,
+                 background_reconnect: bool = True, binary: bool = False):
         if not host:
-            hosts = get_esp_ip()
+            hosts = get_esp_ip(port)
             if not hosts:
                 raise ValueError("Could not find esp on our hotspot")
             host = hosts[0]
         self.host = host
         self.port = port
-        self.sock: Optional[socket.socket] = None
+        # retry_count is the number of consecutive connect failures before
+        # the circuit opens, not a lifetime budget.
         self.retry_count = retry_count
+        self.conn = ConnectionManager(
+            host, port,
+            failure_threshold=retry_count,
+            io_timeout=SOCKET_TIMEOUT,
+            background=background_reconnect,
+        )
         self.pin_states: Dict[int, Literal[0, 1]] = {}
+        # binary=True asks each new connection for the binary protocol
+        # (binproto.py) and falls back to text if the board refuses.
+        self.binary = binary
+        self.codec = TextCodec(self)
+        self._codec_sock: Optional[socket.socket] = None
+        # Framing state: one reusable receive buffer plus whatever bytes
+        # arrived after the last complete line.
+        self._rx_buf = bytearray(RECV_BUFFER_SIZE)
+        self._rx_view = memoryview(self._rx_buf)
+        self._rx_pending = bytearray()
+        self.recv_calls = 0
+
+    @property
+    def sock(self) -> Optional[socket.socket]:
+        return self.conn.sock
 
     def connect(self):
-        """Establish TCP connection with ESP32."""
-        if self.retry_count < 1:
-            logger.error("Failed to establish connection. Exceeded retries.")
-            return
-        if self.sock:
-            logger.warning("Already connected.")
-            return
+        """Make sure the TCP connection to the ESP32 is up.
 
-        try:
-            self.retry_count -= 1
-            logger.info(f"Connecting to ESP32 at {self.host}:{self.port}...")
-            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.sock.settimeout(SOCKET_TIMEOUT)
-            self.sock.connect((self.host, self.port))
-            logger.info("Connection established.")
-        except Exception as e: 
-            logger.warning("Failed to connect to ESP32.")
-            self.sock = None
-            logger.info(f"Sleeping for {RETRY_SECS} before retrying...")
-            time.sleep(RETRY_SECS)
-            self.connect()
+        Makes at most one bounded connect attempt and raises DeviceUnavailable
+        straight away while the board is known to be down; the connection
+        manager keeps reconnecting in the background.
+        """
+        if self.conn.sock is None:
+            self._rx_pending.clear()
+        sock = self.conn.acquire()
+        if sock is not self._codec_sock:
+            self._negotiate(sock)
+
+    def _negotiate(self, sock: socket.socket):
+        """Pick the framing for a fresh connection: binary if requested and the board agrees."""
+        codec = TextCodec(self)
+        if self.binary:
+            from binproto import HANDSHAKE, HANDSHAKE_OK, BinaryCodec
+            try:
+                sock.sendall(HANDSHAKE)
+                reply = self._read_line()
+            except OSError:
+                self._rx_pending.clear()
+                self.conn.invalidate()
+                raise
+            if reply == HANDSHAKE_OK:
+                codec = BinaryCodec(self)
+                logger.info("Using binary protocol.")
+            else:
+                logger.info(f"ESP32 refused binary protocol ({reply!r}); using text.")
+        self.codec = codec
+        self._codec_sock = sock
 
     def disconnect(self):
         """Close the socket connection."""
-        if self.sock:
-            try:
-                self.sock.close()
-                logger.info("Disconnected from ESP32.")
-            finally:
-                self.sock = None
+        if self.conn.close():
+            logger.info("Disconnected from ESP32.")
+        self._rx_pending.clear()
+        self._codec_sock = None
+
+    def _exchange(self, build: ExchangeBuilder) -> list:
+        """Connect, encode the request with the connection's codec, send it and read the replies.
+
+        Any socket error leaves the stream position unknown, so the socket is
+        dropped and handed to the connection manager to re-establish.
+        """
+        self.connect()
+        payload, readers = build(self.codec)
+        try:
+            self.sock.sendall(payload)
+            return [read() for read in readers]
+        except OSError:
+            self._rx_pending.clear()
+            self.conn.invalidate()
+            raise
+
+    def _read_frame(self) -> bytes:
+        """Read one newline-terminated frame, keeping any leftover bytes buffered."""
+        sock = self.sock
+        if not sock:
+            raise RuntimeError("Not connected to ESP32.")
+        pending = self._rx_pending
+        scanned = 0
+        while True:
+            idx = pending.find(b"\n", scanned)
+            if idx >= 0:
+                frame = bytes(pending[:idx])
+                del pending[:idx + 1]
+                return frame
+            scanned = len(pending)
+            n = sock.recv_into(self._rx_buf)
+            self.recv_calls += 1
+            if not n:
+                raise ConnectionError("Disconnected unexpectedly.")
+            pending += self._rx_view[:n]
 
     def _read_line(self) -> str:
         """Read data until newline from ESP32."""
-        if not self.sock:
+        return self._read_frame().decode().strip()
+
+    def _read_exact(self, size: int) -> bytes:
+        """Read one fixed-size binary reply, keeping any leftover bytes buffered."""
+        sock = self.sock
+        if not sock:
             raise RuntimeError("Not connected to ESP32.")
-        buffer = ""
-        while "\n" not in buffer:
-            data = self.sock.recv(1).decode()
-            if not data:
+        pending = self._rx_pending
+        while len(pending) < size:
+            n = sock.recv_into(self._rx_buf)
+            self.recv_calls += 1
+            if not n:
                 raise ConnectionError("Disconnected unexpectedly.")
-            buffer += data
-        return buffer.strip()
+            pending += self._rx_view[:n]
+        frame = bytes(pending[:size])
+        del pending[:size]
+        return frame
 
     def set_pin_state(self, pin: int, state: Literal[0, 1]):
         """Send pin state command to ESP32 and track it locally."""
-        self.connect()
-
-        if pin not in ALLOWED_PINS:
-            raise ValueError(f"Pin {pin} is not allowed.")
-
-        if state not in (0, 1):
-            raise ValueError("State must be 0 or 1.")
+        validate_pin_state(pin, state)
 
-        command = f"{pin} {state}\n"
-        logger.info(f"Sending command: {command.strip()}")
-        self.sock.sendall(command.encode())
-        response = self._read_line()
+        commands = [(pin, state)]
+        logger.info(f"Sending command: {pin} {state}")
+        response, = self._exchange(lambda codec: (codec.encode_sets(commands), [codec.read_status]))
 
         if "OK" in response:
             self.pin_states[pin] = state  # Update local state
@@ -98,13 +371,90 @@ class ESP32Interactor:
 
         return response
 
-    def get_all_pin_states(self) -> Dict[int, Literal[0, 1]]:
-        """Fetch all pin states from ESP32 server using GETALL command."""
-        self.connect()
-        self.sock.sendall(b'GETALL\n')
-        pin_values = self._read_line().split(',')
-        # return {int(i.split(':')[0]): int(i.split(':')[1]) for i in pin_values}
-        return {i.split(":")[0]:i.split(":")[1] for i in pin_values}
+    def set_pin_states(
+        self,
+        commands: Union[Dict[int, int], Iterable[Tuple[int, int]]],
+    ) -> List[Tuple[int, int, str]]:
+        """Pipeline several pin commands in one write, then match the responses in order.
+
+        Accepts a {pin: state} dict or an ordered sequence of (pin, state) pairs
+        (the same pin may appear more than once). Returns (pin, state, response)
+        for every command; only acknowledged pins are updated in pin_states.
+        """
+        commands = normalize_commands(commands)
+        if not commands:
+            return []
+
+        logger.info(f"Sending {len(commands)} pipelined commands")
+        responses = self._exchange(
+            lambda codec: (codec.encode_sets(commands), [codec.read_status] * len(commands)))
+        return self._record_acks(commands, responses)
+
+    def set_pins(self, states: Union[Dict[int, int], Iterable[Tuple[int, int]]]) -> str:
+        """Set several pins together with one SETMASK command: one message, one ack.
+
+        The board validates the whole mask before touching any pin, then
+        switches them in the same GPIO register write, so there is no tearing
+        between pins. Firmware without SETMASK gets pipelined single writes.
+        """
+        commands = normalize_commands(states)
+        if not commands:
+            return "OK"
+        mask, values = pin_mask(commands)
+        logger.info(f"Sending SETMASK for pins {[pin for pin, _ in commands]}")
+        response, = self._exchange(lambda codec: (codec.encode_mask(mask, values), [codec.read_status]))
+        if mask_unsupported(response):
+            logger.warning("ESP32 does not support SETMASK; sending pins one by one.")
+            results = self.set_pin_states(commands)
+            failed = [r for _, _, r in results if "OK" not in r]
+            return failed[0] if failed else "OK"
+        if "OK" in response:
+            self.pin_states.update(commands)
+        else:
+            logger.warning(f"ESP32 rejected SETMASK {mask:#x}/{values:#x}: {response}")
+        return response
+
+    def pulse(self, pin: int, state: Literal[0, 1], duration_ms: int) -> str:
+        """Drive `pin` to `state` and let the board switch it back after `duration_ms`.
+
+        One message and one ack; the board times the pulse itself, so its
+        length does not depend on network latency and the connection is free
+        meanwhile. A later write to the pin cancels the pending revert.
+        pin_states records the level the pin settles at (1 - state).
+        Firmware without PULSE gets two writes timed here, blocking meanwhile.
+        """
+        validate_pulse(pin, state, duration_ms)
+        logger.info(f"Sending pulse: {pin} {state} for {duration_ms} ms")
+        response, = self._exchange(
+            lambda codec: (codec.encode_pulse(pin, state, duration_ms), [codec.read_status]))
+        if "OK" in response:
+            self.pin_states[pin] = 1 - state
+        elif mask_unsupported(response):
+            logger.warning("ESP32 does not support PULSE; timing the pulse here.")
+            response = self.set_pin_state(pin, state)
+            if "OK" in response:
+                time.sleep(duration_ms / 1000)
+                response = self.set_pin_state(pin, 1 - state)
+        else:
+            logger.warning(f"ESP32 rejected pulse on pin {pin}: {response}")
+        return response
+
+    def _record_acks(self, commands: List[Tuple[int, int]],
+                     responses: List[str]) -> List[Tuple[int, int, str]]:
+        """Match responses to commands in order, updating pin_states for acknowledged pins."""
+        results = []
+        for (pin, state), response in zip(commands, responses):
+            if "OK" in response:
+                self.pin_states[pin] = state
+            else:
+                logger.warning(f"ESP32 did not confirm pin {pin} -> {state}: {response}")
+            results.append((pin, state, response))
+        return results
+
+    def get_all_pin_states(self) -> PinSnapshot:
+        """Fetch all pin states and the DHT reading from ESP32 using the GETALL command."""
+        snapshot, = self._exchange(lambda codec: (codec.getall, [codec.read_snapshot]))
+        return snapshot
 
     def __del__(self):
         """Ensure clean shutdown."""
@@ -0,0 +1,48 @@
+import asyncio
+import threading
+from typing import Any, Callable, Optional
+
+
+class LazyInteractor:
+    """Stands in for an interactor (or a cache/multiplexer around one) until first use.
+
+    Building an interactor without a host runs board discovery, and a
+    CommandMultiplexer starts a thread, so frontends create theirs through
+    this proxy: importing the module costs nothing and the first attribute
+    access builds the real object, once, even with concurrent callers.
+
+        esp = LazyInteractor(lambda: StatusCache(CommandMultiplexer(ESP32Interactor())))
+
+    Event-loop code awaits get_async() instead, so discovery does not block the loop.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._target: Optional[Any] = None
+
+    @property
+    def created(self) -> bool:
+        return self._target is not None
+
+    def get(self):
+        target = self._target
+        if target is None:
+            with self._lock:
+                if self._target is None:
+                    self._target = self._factory()
+                target = self._target
+        return target
+
+    async def get_async(self):
+        """get() for event-loop code: the first build (board discovery) runs on a worker thread."""
+        target = self._target
+        if target is None:
+            target = await asyncio.to_thread(self.get)
+        return target
+
+    def __getattr__(self, name):
+        # Only called for attributes the proxy itself does not have
+        if name.startswith("__") or name in ("_factory", "_lock", "_target"):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
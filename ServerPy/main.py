@@ -1,4 +1,5 @@
 from interactor import ESP32Interactor, logger
+from scheduler import PinScheduler
 import time
 
 
@@ -30,6 +31,7 @@ def cli_mainloop():
                 print("Current ESP32 pin states:")
                 for pin, state in sorted(states.items()):
                     print(f"  Pin {pin}: {state}")
+                print(f"  Temperature: {states.temperature} C, humidity: {states.humidity} %")
                 continue
 
             try:
@@ -47,65 +49,57 @@ def cli_mainloop():
         esp.disconnect()
 
 
-def blinker():
-    pins = [13, 12, 14, 27, 26]
-    esp = ESP32Interactor()
-    delay = 0.0  # seconds
+# 26 is the DHT11 data pin, which the board refuses to drive (and an atomic
+# SETMASK containing it would be rejected as a whole)
+BLINKER_PINS = [13, 12, 14, 27, 25]
+
+
+def blinker_patterns(esp, pins=BLINKER_PINS, delay=0.0):
+    """Build the blinker() pattern functions for an interactor (also used by benchmark.py)."""
 
     def off_all():
-        for p in pins:
-            esp.set_pin_state(p, 0)
+        esp.set_pin_states([(p, 0) for p in pins])
 
     def linear_sweep():
+        # The board switches each LED back off itself: one message per LED
+        on_ms = max(1, round(delay * 1000))
         for p in pins:
-            esp.set_pin_state(p, 1)
+            esp.pulse(p, 1, on_ms)
             time.sleep(delay)
-            esp.set_pin_state(p, 0)
 
     def alternate_blink():
         group1 = pins[::2]
         group2 = pins[1::2]
         for _ in range(3):
-            for p in group1:
-                esp.set_pin_state(p, 1)
-            for p in group2:
-                esp.set_pin_state(p, 0)
+            # Each frame is one atomic SETMASK so both groups flip together
+            esp.set_pins([(p, 1) for p in group1] + [(p, 0) for p in group2])
             time.sleep(delay)
-            for p in group1:
-                esp.set_pin_state(p, 0)
-            for p in group2:
-                esp.set_pin_state(p, 1)
+            esp.set_pins([(p, 0) for p in group1] + [(p, 1) for p in group2])
             time.sleep(delay)
-            off_all()
+            esp.set_pins([(p, 0) for p in pins])
 
     def odd_even_chase():
         odds = [p for p in pins if p % 2 == 1]
         evens = [p for p in pins if p % 2 == 0]
         for _ in range(2):
-            for p in odds:
-                esp.set_pin_state(p, 1)
+            esp.set_pin_states([(p, 1) for p in odds])
             time.sleep(delay)
-            for p in odds:
-                esp.set_pin_state(p, 0)
-            for p in evens:
-                esp.set_pin_state(p, 1)
+            esp.set_pin_states([(p, 0) for p in odds] + [(p, 1) for p in evens])
             time.sleep(delay)
-            for p in evens:
-                esp.set_pin_state(p, 0)
+            esp.set_pin_states([(p, 0) for p in evens])
 
     def flash_all(times=3):
         for _ in range(times):
-            for p in pins:
-                esp.set_pin_state(p, 1)
+            esp.set_pins([(p, 1) for p in pins])
             time.sleep(delay)
-            off_all()
+            esp.set_pins([(p, 0) for p in pins])
             time.sleep(delay)
 
     def ping_pong():
         sequence = pins + pins[::-1][1:-1]
         for p in sequence:
-            off_all()
-            esp.set_pin_state(p, 1)
+            # off_all() and the new pin in a single round trip
+            esp.set_pin_states([(q, 0) for q in pins] + [(p, 1)])
             time.sleep(delay)
         off_all()
 
@@ -116,17 +110,23 @@ def blinker():
             esp.set_pin_state(p, s)
             time.sleep(delay)
 
+    return [
+        linear_sweep,
+        alternate_blink,
+        odd_even_chase,
+        flash_all,
+        ping_pong,
+        random_chaos,
+    ]
+
+
+def blinker():
+    pins = BLINKER_PINS
+    esp = ESP32Interactor()
+    delay = 0.0  # seconds
+
     # Pattern cycle
-    patterns = cycle(
-        [
-            linear_sweep,
-            alternate_blink,
-            odd_even_chase,
-            flash_all,
-            ping_pong,
-            random_chaos,
-        ]
-    )
+    patterns = cycle(blinker_patterns(esp, pins, delay))
 
     print("Running LED blinker patterns (Ctrl+C to stop)")
     try:
@@ -136,10 +136,47 @@ def blinker():
             pattern()
     except KeyboardInterrupt:
         print("Stopping blinker...")
-        off_all()
+        esp.set_pin_states([(p, 0) for p in pins])
         esp.disconnect()
 
 
+def scheduled_blinker(period=1.0, on_ms=200):
+    """Chase across BLINKER_PINS driven by one scheduler thread instead of sleeps.
+
+    Every LED pulses once per period, staggered evenly; the board ends each pulse.
+    """
+    pins = BLINKER_PINS
+    sched = PinScheduler(ESP32Interactor())
+    step = period / len(pins)
+    for i, pin in enumerate(pins):
+        sched.every(period, lambda esp, p=pin: esp.pulse(p, 1, on_ms), first=i * step)
+
+    print("Running scheduled chase (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(5)
+            print(sched.stats())
+    except KeyboardInterrupt:
+        print("Stopping blinker...")
+    finally:
+        sched.close()
+
+
+def pattern_blinker(fps=10):
+    """The blinker() cycle compiled to frames and played at a fixed frame rate."""
+    from patterns import PatternPlayer, compile_patterns
+
+    frames = compile_patterns(BLINKER_PINS)
+    print(f"Playing {len(frames)} frames at {fps} fps (Ctrl+C to stop)")
+    with PatternPlayer(ESP32Interactor()) as player:
+        try:
+            while True:
+                print(player.play(frames, fps))
+        except KeyboardInterrupt:
+            print("Stopping blinker...")
+            player.esp.set_pins([(p, 0) for p in BLINKER_PINS])
+
+
 # from interactor import ESP32Interactor, logger
 # esp = -----------------192.168.137.2.168.137.237.106")
 # ALLOWED_PINS = [13, 12, 14, 27, 26, 25, 33, 32, 35, 34]
@@ -172,4 +209,6 @@ def a_function():
 if __name__ == "__main__":
     cli_mainloop()
     # blinker()
+    # scheduled_blinker()
+    # pattern_blinker()
     # a_function()
@@ -0,0 +1,259 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Literal, Optional, Tuple
+
+from interactor import (
+    ESP32Interactor,
+    ExchangeBuilder,
+    PinSnapshot,
+    logger,
+    mask_commands,
+    mask_unsupported,
+    normalize_commands,
+    pin_mask,
+    validate_pin_state,
+    validate_pulse,
+)
+
+MAX_BATCH = 32
+
+
+class _Request:
+    __slots__ = ("build", "responses", "handler", "future", "enqueued")
+
+    def __init__(self, build: ExchangeBuilder, handler: Callable[[list], object]):
+        self.build = build
+        self.responses = 0
+        self.handler = handler
+        self.future: Future = Future()
+        self.enqueued = time.monotonic()
+
+
+class CommandMultiplexer:
+    """Thread-safe front for one ESP32Interactor.
+
+    A single worker thread owns the interactor and its socket. Callers
+    from any thread submit commands and get concurrent.futures.Future
+    objects back. The worker drains whatever is queued, writes it as
+    one pipelined burst and hands the response lines back in FIFO order,
+    so concurrent Flask requests, bots and the gesture worker can never
+    read each other's replies.
+
+    set_pin_state / set_pin_states / get_all_pin_states block on the
+    future, so the multiplexer drops in wherever an interactor was used.
+    """
+
+    def __init__(self, esp: ESP32Interactor, max_batch: int = MAX_BATCH):
+        self.esp = esp
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._batches = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._worker = threading.Thread(target=self._run, name="esp32-mux", daemon=True)
+        self._worker.start()
+
+    @property
+    def pin_states(self) -> Dict[int, Literal[0, 1]]:
+        return self.esp.pin_states
+
+    # -- submission ----------------------------------------------------------
+
+    def submit(self, build: ExchangeBuilder,
+               handler: Callable[[list], object] = lambda replies: replies) -> Future:
+        """Queue a request; build(codec) -> (bytes, readers) runs on the worker,
+        after the connection (and its text or binary framing) is settled."""
+        if not self._worker.is_alive():
+            raise RuntimeError("Command multiplexer is closed.")
+        request = _Request(build, handler)
+        with self._stats_lock:
+            self._submitted += 1
+        self._queue.put(request)
+        return request.future
+
+    def submit_pin_state(self, pin: int, state: Literal[0, 1]) -> Future:
+        validate_pin_state(pin, state)
+        commands = [(pin, state)]
+        return self.submit(
+            lambda codec: (codec.encode_sets(commands), [codec.read_status]),
+            lambda replies: self.esp._record_acks(commands, replies)[0][2],
+        )
+
+    def submit_pin_states(self, commands) -> Future:
+        commands = normalize_commands(commands)
+        if not commands:
+            done: Future = Future()
+            done.set_result([])
+            return done
+        return self.submit(
+            lambda codec: (codec.encode_sets(commands), [codec.read_status] * len(commands)),
+            lambda replies: self.esp._record_acks(commands, replies),
+        )
+
+    def submit_pins(self, states) -> Future:
+        """Queue one atomic SETMASK write; resolves to the board's single response."""
+        return self.submit_mask(*pin_mask(normalize_commands(states)))
+
+    def submit_mask(self, mask: int, values: int) -> Future:
+        """submit_pins for a ready-made (mask, values) pair, e.g. a compiled pattern frame."""
+        commands = mask_commands(mask, values)
+
+        def handle(replies):
+            if "OK" in replies[0]:
+                self.esp.pin_states.update(commands)
+            return replies[0]
+
+        return self.submit(
+            lambda codec: (codec.encode_mask(mask, values), [codec.read_status]), handle)
+
+    def submit_pulse(self, pin: int, state: Literal[0, 1], duration_ms: int) -> Future:
+        validate_pulse(pin, state, duration_ms)
+
+        def handle(replies):
+            if "OK" in replies[0]:
+                self.esp.pin_states[pin] = 1 - state
+            return replies[0]
+
+        return self.submit(
+            lambda codec: (codec.encode_pulse(pin, state, duration_ms), [codec.read_status]), handle)
+
+    def submit_get_all(self) -> Future:
+        return self.submit(lambda codec: (codec.getall, [codec.read_snapshot]),
+                           lambda replies: replies[0])
+
+    # -- blocking interactor-compatible API ----------------------------------
+
+    def set_pin_state(self, pin: int, state: Literal[0, 1], timeout: Optional[float] = None) -> str:
+        return self.submit_pin_state(pin, state).result(timeout)
+
+    def set_pin_states(self, commands, timeout: Optional[float] = None) -> List[Tuple[int, int, str]]:
+        return self.submit_pin_states(commands).result(timeout)
+
+    def set_pins(self, states, timeout: Optional[float] = None) -> str:
+        """See ESP32Interactor.set_pins; falls back to pipelined writes on older firmware."""
+        commands = normalize_commands(states)
+        if not commands:
+            return "OK"
+        response = self.submit_pins(commands).result(timeout)
+        if mask_unsupported(response):
+            failed = [r for _, _, r in self.set_pin_states(commands, timeout) if "OK" not in r]
+            return failed[0] if failed else "OK"
+        return response
+
+    def pulse(self, pin: int, state: Literal[0, 1], duration_ms: int,
+              timeout: Optional[float] = None) -> str:
+        """See ESP32Interactor.pulse; older firmware gets two writes timed here."""
+        response = self.submit_pulse(pin, state, duration_ms).result(timeout)
+        if mask_unsupported(response):
+            response = self.set_pin_state(pin, state, timeout)
+            if "OK" in response:
+                time.sleep(duration_ms / 1000)
+                response = self.set_pin_state(pin, 1 - state, timeout)
+        return response
+
+    def get_all_pin_states(self, timeout: Optional[float] = None) -> PinSnapshot:
+        return self.submit_get_all().result(timeout)
+
+    # -- worker --------------------------------------------------------------
+
+    def _run(self):
+        closing = False
+        while not closing:
+            request = self._queue.get()
+            if request is None:
+                break
+            batch = [request]
+            while len(batch) < self.max_batch:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    closing = True
+                    break
+                batch.append(nxt)
+            self._run_batch(batch)
+
+        # Anything submitted after close() will never be written
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None and request.future.set_running_or_notify_cancel():
+                request.future.set_exception(RuntimeError("Command multiplexer is closed."))
+        self.esp.disconnect()
+
+    def _run_batch(self, batch: List[_Request]):
+        now = time.monotonic()
+        live = [r for r in batch if r.future.set_running_or_notify_cancel()]
+        if not live:
+            return
+        with self._stats_lock:
+            self._batches += 1
+            for r in live:
+                wait = now - r.enqueued
+                self._wait_total += wait
+                self._wait_max = max(self._wait_max, wait)
+
+        def build(codec):
+            payloads, readers = [], []
+            for r in live:
+                payload, request_readers = r.build(codec)
+                r.responses = len(request_readers)
+                payloads.append(payload)
+                readers.extend(request_readers)
+            return b"".join(payloads), readers
+
+        try:
+            lines = self.esp._exchange(build)
+        except Exception as e:
+            logger.warning(f"Multiplexed batch of {len(live)} failed: {e}")
+            with self._stats_lock:
+                self._failed += len(live)
+            for r in live:
+                r.future.set_exception(e)
+            return
+
+        offset = 0
+        for r in live:
+            chunk = lines[offset:offset + r.responses]
+            offset += r.responses
+            try:
+                r.future.set_result(r.handler(chunk))
+                with self._stats_lock:
+                    self._completed += 1
+            except Exception as e:
+                with self._stats_lock:
+                    self._failed += 1
+                r.future.set_exception(e)
+
+    # -- lifecycle / stats ---------------------------------------------------
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            served = self._completed + self._failed
+            return {
+                "queue_depth": self._queue.qsize(),
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "batches": self._batches,
+                "avg_wait_ms": round(self._wait_total / served * 1e3, 3) if served else 0.0,
+                "max_wait_ms": round(self._wait_max * 1e3, 3),
+            }
+
+    def close(self, timeout: Optional[float] = 5):
+        """Finish queued commands, then stop the worker and disconnect."""
+        if self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join(timeout)
+
+    def disconnect(self):
+        self.close()
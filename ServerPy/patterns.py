@@ -0,0 +1,219 @@
+"""LED patterns compiled to NumPy frames and played back at a fixed frame rate.
+
+A pattern is a uint16 array with one pin bitmask per frame (bit i is
+ALLOWED_PINS[i], the same layout as SETMASK). Playback sends one SETMASK per
+frame covering only the pins that changed since the previous frame, and
+frames whose pins did not change are not sent at all:
+
+    frames = compile_patterns(BLINKER_PINS)
+    with PatternPlayer(ESP32Interactor()) as player:
+        print(player.play(frames, fps=30))
+"""
+import math
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from interactor import ALLOWED_PINS, ESP32Interactor, logger, validate_pin_state
+from mux import CommandMultiplexer
+
+MAX_INFLIGHT = 64  # frames sent but not yet acknowledged
+SPIN_SECS = 0.002  # sleep() can overshoot by milliseconds; busy-wait the last stretch
+LATE_TOLERANCE = 0.05  # share of frames that may miss their slot (host scheduling noise)
+FRAME = np.uint16
+
+
+def pin_bits(pins: Sequence[int]) -> np.ndarray:
+    """Bitmask of each pin, in the order given."""
+    for pin in pins:
+        validate_pin_state(pin, 0)
+    return np.array([1 << ALLOWED_PINS.index(pin) for pin in pins], dtype=FRAME)
+
+
+def _join(bits: np.ndarray) -> int:
+    return int(np.bitwise_or.reduce(bits)) if len(bits) else 0
+
+
+# -- pattern builders (the blinker() patterns as frame arrays) -------------------
+
+def linear_sweep(pins: Sequence[int]) -> np.ndarray:
+    return np.append(pin_bits(pins), FRAME(0))
+
+
+def alternate_blink(pins: Sequence[int], times: int = 3) -> np.ndarray:
+    bits = pin_bits(pins)
+    return np.tile(np.array([_join(bits[::2]), _join(bits[1::2]), 0], dtype=FRAME), times)
+
+
+def odd_even_chase(pins: Sequence[int], times: int = 2) -> np.ndarray:
+    bits = pin_bits(pins)
+    odd = np.array(pins) % 2 == 1
+    return np.tile(np.array([_join(bits[odd]), _join(bits[~odd]), 0], dtype=FRAME), times)
+
+
+def flash_all(pins: Sequence[int], times: int = 3) -> np.ndarray:
+    return np.tile(np.array([_join(pin_bits(pins)), 0], dtype=FRAME), times)
+
+
+def ping_pong(pins: Sequence[int]) -> np.ndarray:
+    bits = pin_bits(pins)
+    order = np.r_[np.arange(len(bits)), np.arange(len(bits) - 2, 0, -1)]
+    return np.append(bits[order], FRAME(0))
+
+
+def random_chaos(pins: Sequence[int], frames: int = 10, seed: Optional[int] = None) -> np.ndarray:
+    """Every frame lights a random subset of the pins."""
+    on = np.random.default_rng(seed).integers(0, 2, size=(frames, len(pins)), dtype=FRAME)
+    return np.append(on @ pin_bits(pins), FRAME(0)).astype(FRAME)
+
+
+PATTERNS = [linear_sweep, alternate_blink, odd_even_chase, flash_all, ping_pong, random_chaos]
+
+
+def compile_patterns(pins: Sequence[int], patterns: Iterable = PATTERNS) -> np.ndarray:
+    """One frame array running each pattern in turn, like one blinker() cycle."""
+    return np.concatenate([pattern(pins) for pattern in patterns]).astype(FRAME)
+
+
+def frame_changes(frames: np.ndarray, initial: int = 0) -> np.ndarray:
+    """Bitmask of the pins each frame changes, relative to the one before."""
+    previous = np.empty_like(frames)
+    previous[0] = initial
+    previous[1:] = frames[:-1]
+    return frames ^ previous
+
+
+# -- playback --------------------------------------------------------------------
+
+class PatternPlayer:
+    """Plays frame arrays at a fixed rate through a CommandMultiplexer.
+
+    Frame k is due at start + k / fps (absolute deadlines, so the rate does
+    not drift). Frames are submitted without waiting for the previous ack;
+    the multiplexer pipelines them, and up to `max_inflight` may be
+    outstanding before the player blocks on the oldest one.
+    """
+
+    def __init__(self, esp, max_inflight: int = MAX_INFLIGHT):
+        self._owned = None
+        if isinstance(esp, ESP32Interactor):
+            esp = self._owned = CommandMultiplexer(esp)
+        self.esp = esp
+        self.max_inflight = max_inflight
+
+    def _current(self) -> int:
+        """The acknowledged pin levels as a frame, so playback starts from the board's state."""
+        bits = 0
+        for pin, state in self.esp.pin_states.items():
+            if state and pin in ALLOWED_PINS:
+                bits |= 1 << ALLOWED_PINS.index(pin)
+        return bits
+
+    def play(self, frames: np.ndarray, fps: float) -> Dict[str, float]:
+        """Play `frames` at `fps`, wait for every ack and report how well the rate held."""
+        frames = np.asarray(frames, dtype=FRAME)
+        period = 1.0 / fps
+        changes = frame_changes(frames, self._current())
+        # Only frames that change something go on the wire
+        active = np.flatnonzero(changes)
+        masks = changes[active].tolist()
+        values = (frames[active] & changes[active]).tolist()
+        offsets = (active * period).tolist()
+
+        inflight = deque()
+        lateness: List[float] = []
+        errors = stalls = 0
+        start = time.perf_counter() + period
+        for offset, mask, value in zip(offsets, masks, values):
+            due = start + offset
+            wait = due - time.perf_counter() - SPIN_SECS
+            if wait > 0:
+                time.sleep(wait)
+            while time.perf_counter() < due:
+                time.sleep(0)  # yield the GIL to the multiplexer while spinning
+            while inflight and inflight[0].done():
+                errors += not self._ack(inflight.popleft())
+            if len(inflight) >= self.max_inflight:
+                # The board is not keeping up: wait for the oldest frame's ack
+                stalls += 1
+                errors += not self._ack(inflight.popleft())
+            lateness.append(time.perf_counter() - due)
+            inflight.append(self.esp.submit_mask(mask, value))
+        while inflight:
+            errors += not self._ack(inflight.popleft())
+        elapsed = time.perf_counter() - start
+
+        lateness.sort()
+        # Late: sent after the following frame was already due. A few are host
+        # scheduling noise; many, or a full in-flight window, mean this rate
+        # is more than the player or the link can carry.
+        late = sum(1 for x in lateness if x > period)
+        duration = len(frames) * period
+        achieved = len(frames) / max(elapsed, duration)
+
+        def lateness_ms(q):
+            return round(lateness[int(q * (len(lateness) - 1))] * 1e3, 3) if lateness else 0.0
+
+        return {
+            "fps": fps,
+            "frames": len(frames),
+            "sent": len(masks),
+            "errors": errors,
+            "late_frames": late,
+            "stalls": stalls,
+            "lateness_p50_ms": lateness_ms(0.50),
+            "lateness_p95_ms": lateness_ms(0.95),
+            "lateness_p99_ms": lateness_ms(0.99),
+            "achieved_fps": round(achieved, 1),
+            "sustained": errors == 0 and stalls == 0 and late <= LATE_TOLERANCE * len(masks)
+                         and achieved >= 0.95 * fps,
+        }
+
+    @staticmethod
+    def _ack(future) -> bool:
+        try:
+            return "OK" in future.result()
+        except Exception as e:
+            logger.warning(f"Pattern frame failed: {e}")
+            return False
+
+    def max_frame_rate(self, frames: np.ndarray, low: float = 10.0, high: float = 10000.0,
+                       tolerance: float = 0.05, seconds: float = 1.0) -> float:
+        """Highest fps (within `tolerance`) at which play() still reports sustained.
+
+        Doubles the rate from `low` until playback falls behind, then bisects.
+        Each trial loops `frames` for about `seconds`, so one scheduling hiccup
+        does not decide it. Returns 0.0 if even `low` cannot be sustained.
+        """
+        def sustained(rate):
+            loops = max(1, math.ceil(rate * seconds / len(frames)))
+            return self.play(np.tile(frames, loops), rate)["sustained"]
+
+        if not sustained(low):
+            return 0.0
+        good, bad = low, None
+        while bad is None and good < high:
+            rate = min(good * 2, high)
+            if sustained(rate):
+                good = rate
+            else:
+                bad = rate
+        while bad is not None and bad - good > tolerance * good:
+            rate = (good + bad) / 2
+            if sustained(rate):
+                good = rate
+            else:
+                bad = rate
+        return round(good, 1)
+
+    def close(self):
+        if self._owned is not None:
+            self._owned.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -2,7 +2,6 @@
 from flask import Flask, render_template, request, jsonify
 # import speech_recognition as sr
 # from telegram.ext import Updater, CommandHandler, MessageHandler, Filters
-from interactor import ESP32Interactor
 # import os
 
 # import logging
@@ -307,39 +306,41 @@ from interactor import ESP32Interactor
 
 
 
-from flask import Flask, request, jsonify, render_template_string
+from flask import Blueprint, Flask, Response, request, jsonify, render_template_string
 import threading
 import os
 import time
 from datetime import datetime
 import queue
 import logging
-import cv2
-import mediapipe as mp
+from chunks import MemoryChunk
+from events import StatusBroadcaster
+from streams import LateChunk
+from video_worker import GesturePool
+from ws_control import register_control_socket
 
-app = Flask(__name__)
+bp = Blueprint('runner', __name__)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# MediaPipe setup
-mp_hands = mp.solutions.hands
-mp_drawing = mp.solutions.drawing_utils
-
-# ESP32 Pin mapping (adjust according to your setup)
-FINGER_TO_PIN = {
-    0: 13,  # Thumb
-    1: 12,  # Index
-    2: 14,  # Middle
-    3: 27,  # Ring
-    4: 25,   # Pinky
-}
-# Create uploads directory if it doesn't exist
+
+# Created by create_app()
 UPLOAD_DIR = 'uploads'
 PROCESSED_DIR = 'processed'
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-os.makedirs(PROCESSED_DIR, exist_ok=True)
+
+# Keep live stream chunks in memory (see chunks.py); manual recordings are
+# always saved to UPLOAD_DIR and archived in PROCESSED_DIR
+IN_MEMORY_CHUNKS = True
+
+# Gesture worker processes (each loads its own MediaPipe model); one core is
+# left for the web server. 0 analyses on a thread in this process instead.
+GESTURE_PROCESSES = max(1, (os.cpu_count() or 1) - 1)
+
+# Seconds a chunk may wait in video_queue; as the wait (or queue depth)
+# approaches this, the gesture workers sample fewer frames to catch up
+LATENCY_BUDGET = 1.0
 
 # Device states
 device_states = {
@@ -348,126 +349,73 @@ device_states = {
     'door': 0
 }
 
+# Pushes device_states changes to every /events client from one poller
+status_events = StatusBroadcaster(lambda: dict(device_states))
+
+
+def apply_device_states(states):
+    """
+    Apply {device: state} from the WebSocket control channel
+    """
+    unknown = [device for device in states if device not in device_states]
+    if unknown:
+        raise ValueError(f"Invalid device: {', '.join(unknown)}")
+    device_states.update(states)
+    status_events.publish(states)
+    return {device: 'OK' for device in states}
 
-def get_finger_states(landmarks):
-    """Extract finger states from MediaPipe hand landmarks"""
-    # Finger tip and pip landmark indices
-    FINGER_TIPS = [4, 8, 12, 16, 20]  # Thumb, Index, Middle, Ring, Pinky
-    FINGER_PIPS = [3, 6, 10, 14, 18]  # PIP joints for each finger
-    
-    states = []
-    
-    for i, (tip, pip) in enumerate(zip(FINGER_TIPS, FINGER_PIPS)):
-        if i == 0:  # Thumb (different logic due to orientation)
-            # Thumb is extended if tip x-coordinate > pip x-coordinate
-            is_extended = landmarks.landmark[tip].x > landmarks.landmark[pip].x
-        else:  # Other fingers
-            # Finger is extended if tip y-coordinate < pip y-coordinate
-            is_extended = landmarks.landmark[tip].y < landmarks.landmark[pip].y
-        
-        states.append(1 if is_extended else 0)
-    
-    return states
 
 # Video processing queue for live stream
 video_queue = queue.Queue(maxsize=10)  # Limit queue size to prevent memory issues
 processing_active = True
 
-def gesture_analysis(video_path, chunk_id=None, timestamp=None, is_live=False):
+# Processes start and the board is connected on the first chunk
+gesture_pool = GesturePool(GESTURE_PROCESSES)
+
+def finish_chunk(video, is_live, processed_frames, error):
     """
-    Process video file for gesture recognition using MediaPipe
+    Log a chunk's result and clean up its file once its pin commands were applied
     """
-    try:
-        logger.info(f"Processing {'live stream chunk' if is_live else 'video'}: {video_path}")
-        
-        # Initialize ESP32 interactor
-        esp = ESP32Interactor()
-        last_state = [0, 0, 0, 0, 0]  # Store previous finger states
-        
-        # Open video file
-        cap = cv2.VideoCapture(video_path)
-        
-        if not cap.isOpened():
-            logger.error(f"Could not open video file: {video_path}")
-            return
-        
-        with mp_hands.Hands(
-            static_image_mode=False, 
-            max_num_hands=1, 
-            min_detection_confidence=0.6,
-            min_tracking_confidence=0.5
-        ) as hands:
-            
-            frame_count = 0
-            processed_frames = 0
-            
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                    
-                frame_count += 1
-                
-                # Process every nth frame for efficiency (adjust as needed)
-                if frame_count % 3 != 0:  # Process every 3rd frame
-                    continue
-                    
-                processed_frames += 1
-                
-                # Flip frame horizontally for mirror effect
-                frame = cv2.flip(frame, 1)
-                
-                # Convert BGR to RGB for MediaPipe
-                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                result = hands.process(rgb)
-                
-                if result.multi_hand_landmarks:
-                    for hand_landmarks in result.multi_hand_landmarks:
-                        # Get finger states
-                        states = get_finger_states(hand_landmarks)
-                        
-                        # Send pin updates if changed
-                        for i, state in enumerate(states):
-                            pin = FINGER_TO_PIN[i]
-                            print(f"{pin}\n"*100)
-                            if state != last_state[i]:
-                                esp.set_pin_state(pin, state)
-                        
-                        last_state = states
-                        
-                        # Log finger states for debugging
-                        finger_names = ['Thumb', 'Index', 'Middle', 'Ring', 'Pinky']
-                        active_fingers = [finger_names[i] for i, state in enumerate(states) if state]
-                        if active_fingers:
-                            logger.debug(f"Active fingers: {', '.join(active_fingers)}")
-        
-        cap.release()
-        
-        logger.info(f"Gesture analysis completed for {video_path}. Processed {processed_frames} frames.")
-        
-        # Clean up video file after processing (for live streams)
-        if is_live and os.path.exists(video_path):
-            try:
-                os.remove(video_path)
-                logger.debug(f"Cleaned up live stream file: {video_path}")
-            except Exception as e:
-                logger.warning(f"Could not remove file {video_path}: {str(e)}")
-        elif not is_live and os.path.exists(video_path):
-            # Move processed file to processed directory
-            processed_path = os.path.join(PROCESSED_DIR, os.path.basename(video_path))
-            try:
-                os.rename(video_path, processed_path)
-                logger.info(f"Moved processed file to: {processed_path}")
-            except Exception as e:
-                logger.warning(f"Could not move file to processed directory: {str(e)}")
-            
-    except Exception as e:
-        logger.error(f"Error in gesture analysis: {str(e)}")
-        # Make sure to release video capture even if error occurs
+    if isinstance(error, LateChunk):
+        logger.warning(f"Dropped late chunk {video}: {str(error)}")
+    elif error is not None:
+        logger.error(f"Error in gesture analysis for {video}: {str(error)}")
+    else:
+        logger.info(f"Gesture analysis completed for {video}. Processed {processed_frames} frames.")
+    
+    # Clean up video file after processing (for live streams); in-memory chunks leave nothing behind
+    video_path = video if isinstance(video, str) else None
+    if is_live and video_path and os.path.exists(video_path):
+        try:
+            os.remove(video_path)
+            logger.debug(f"Cleaned up live stream file: {video_path}")
+        except Exception as e:
+            logger.warning(f"Could not remove file {video_path}: {str(e)}")
+    elif not is_live and video_path and os.path.exists(video_path):
+        # Move processed file to processed directory
+        processed_path = os.path.join(PROCESSED_DIR, os.path.basename(video_path))
         try:
-            cap.release()
-        except:
-            pass
+            os.rename(video_path, processed_path)
+            logger.info(f"Moved processed file to: {processed_path}")
+        except Exception as e:
+            logger.warning(f"Could not move file to processed directory: {str(e)}")
+
+def queue_pressure(queued_at=None):
+    """
+    How far behind the processor is, 0..1: queue depth or this chunk's wait against LATENCY_BUDGET
+    """
+    depth = video_queue.qsize() / video_queue.maxsize
+    lag = (time.monotonic() - queued_at) / LATENCY_BUDGET if queued_at is not None else 0.0
+    return min(1.0, max(depth, lag))
+
+def gesture_analysis(video, chunk_id=None, timestamp=None, is_live=False, session_id=None, queued_at=None):
+    """
+    Hand a video file path or MemoryChunk to the gesture pool; blocks while the pool is full
+    """
+    logger.info(f"Processing {'live stream chunk' if is_live else 'video'}: {video}")
+    gesture_pool.submit(video, chunk_id, timestamp, session_id,
+                        on_done=lambda frames, error: finish_chunk(video, is_live, frames, error),
+                        pressure=queue_pressure(queued_at) if is_live else 0.0)
 
 def control_device(device, state):
     """
@@ -475,6 +423,7 @@ def control_device(device, state):
     """
     if device in device_states:
         device_states[device] = state
+        status_events.publish({device: state})
         logger.info(f"Device {device} set to {'ON' if state else 'OFF'}")
         
         # Here you would send the command to your ESP32
@@ -493,10 +442,10 @@ def video_processor_worker():
             if video_data is None:  # Shutdown signal
                 break
                 
-            video_path, chunk_id, timestamp, is_live = video_data
+            video, chunk_id, timestamp, is_live, session_id, queued_at = video_data
             
             # Process the video
-            gesture_analysis(video_path, chunk_id, timestamp, is_live)
+            gesture_analysis(video, chunk_id, timestamp, is_live, session_id, queued_at)
             
             # Mark task as done
             video_queue.task_done()
@@ -505,12 +454,20 @@ def video_processor_worker():
             continue
         except Exception as e:
             logger.error(f"Error in video processor worker: {str(e)}")
+    gesture_pool.close()
 
-# Start background video processor
-processor_thread = threading.Thread(target=video_processor_worker, daemon=True)
-processor_thread.start()
+processor_thread = None
 
-@app.route('/')
+def start_processor():
+    """
+    Start the background video processor (once)
+    """
+    global processor_thread
+    if processor_thread is None:
+        processor_thread = threading.Thread(target=video_processor_worker, daemon=True)
+        processor_thread.start()
+
+@bp.route('/')
 def index():
     """
     Serve the HTML interface
@@ -518,7 +475,7 @@ def index():
     # You can return your HTML file here or use render_template
     return render_template("index.html")
 
-@app.route('/control', methods=['POST'])
+@bp.route('/control', methods=['POST'])
 def control():
     """
     Handle device control requests
@@ -530,6 +487,7 @@ def control():
         
         if device in device_states:
             device_states[device] = state
+            status_events.publish({device: state})
             logger.info(f"Manual control: {device} set to {'ON' if state else 'OFF'}")
             
             # Send command to ESP32 here
@@ -543,14 +501,22 @@ def control():
         logger.error(f"Error in control endpoint: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/status', methods=['GET'])
+@bp.route('/status', methods=['GET'])
 def status():
     """
     Get current device states
     """
     return jsonify(device_states)
 
-@app.route('/upload', methods=['POST'])
+@bp.route('/events', methods=['GET'])
+def events():
+    """
+    Server-Sent Events stream of device state changes
+    """
+    return Response(status_events.stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@bp.route('/upload', methods=['POST'])
 def upload():
     """
     Handle video upload from live stream or manual recording
@@ -574,24 +540,33 @@ def upload():
             filename = f"live_chunk_{chunk_id}_{int(time.time())}.webm"
         else:
             filename = f"recording_{int(time.time())}_{video.filename}"
-            
-        filepath = os.path.join(UPLOAD_DIR, filename)
         
-        # Save the video file
-        video.save(filepath)
-        logger.info(f"Saved {'live stream chunk' if is_live_stream else 'video'}: {filepath}")
+        # Chunks of one stream share a session; each manual recording is its own
+        session_id = request.form.get('session_id') or ('live' if is_live_stream else filename)
+            
+        if is_live_stream and IN_MEMORY_CHUNKS:
+            # Live chunks are analysed once and discarded: skip the disk round trip
+            chunk = MemoryChunk(filename, video.read())
+            logger.info(f"Buffered live stream chunk in memory: {filename} ({len(chunk)} bytes)")
+        else:
+            chunk = os.path.join(UPLOAD_DIR, filename)
+            
+            # Save the video file
+            video.save(chunk)
+            logger.info(f"Saved {'live stream chunk' if is_live_stream else 'video'}: {chunk}")
         
         # Add to processing queue
+        item = (chunk, chunk_id, timestamp, is_live_stream, session_id, time.monotonic())
         try:
-            video_queue.put_nowait((filepath, chunk_id, timestamp, is_live_stream))
+            video_queue.put_nowait(item)
         except queue.Full:
             logger.warning("Video processing queue is full, skipping oldest item")
             try:
                 # Remove oldest item and add new one
                 old_item = video_queue.get_nowait()
-                video_queue.put_nowait((filepath, chunk_id, timestamp, is_live_stream))
+                video_queue.put_nowait(item)
             except queue.Empty:
-                video_queue.put_nowait((filepath, chunk_id, timestamp, is_live_stream))
+                video_queue.put_nowait(item)
         
         return jsonify({
             'success': True, 
@@ -604,7 +579,7 @@ def upload():
         logger.error(f"Error in upload endpoint: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/stream_stats', methods=['GET'])
+@bp.route('/stream_stats', methods=['GET'])
 def stream_stats():
     """
     Get streaming statistics
@@ -613,10 +588,11 @@ def stream_stats():
         'queue_size': video_queue.qsize(),
         'processing_active': processing_active,
         'upload_dir_files': len(os.listdir(UPLOAD_DIR)) if os.path.exists(UPLOAD_DIR) else 0,
-        'processed_dir_files': len(os.listdir(PROCESSED_DIR)) if os.path.exists(PROCESSED_DIR) else 0
+        'processed_dir_files': len(os.listdir(PROCESSED_DIR)) if os.path.exists(PROCESSED_DIR) else 0,
+        'gesture_pool': gesture_pool.stats()
     })
 
-@app.route('/cleanup', methods=['POST'])
+@bp.route('/cleanup', methods=['POST'])
 def cleanup():
     """
     Cleanup old video files
@@ -653,12 +629,26 @@ def shutdown_handler():
     global processing_active
     processing_active = False
     video_queue.put(None)  # Signal to stop worker
-    processor_thread.join(timeout=5)
+    if processor_thread is not None:
+        processor_thread.join(timeout=5)
+
+def create_app():
+    """
+    Build the gesture/dashboard app and start the video processor
+    """
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    # Persistent /ws control channel, when flask-sock is installed
+    register_control_socket(app, apply_device_states, status_events)
+    start_processor()
+    return app
 
 if __name__ == '__main__':
     try:
         # Run the Flask app
-        app.run(host='0.0.0.0', port=5000, debug=True, threaded=True)
+        create_app().run(host='0.0.0.0', port=5000, debug=True, threaded=True)
     except KeyboardInterrupt:
         logger.info("Shutting down...")
         shutdown_handler()
\ No newline at end of file
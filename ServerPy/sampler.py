@@ -0,0 +1,84 @@
+"""Adaptive frame sampling for gesture inference.
+
+Hand inference costs far more than decoding, and most frames of a gesture
+stream look like the one before. FrameSampler compares each decoded frame
+with the last one inferred, on a thumbnail taken by NumPy slicing, and
+skips it unless it moved:
+
+  * while the picture moves, every `floor`-th frame is inferred;
+  * while it is still, the gap widens up to `cap` frames, so a slow
+    gesture is still seen within cap / fps seconds;
+  * `pressure` (0..1: queue depth, or lag against the latency budget)
+    raises both, trading accuracy for keeping up.
+
+    sampler = FrameSampler()
+    sampler.start(pressure=0.2)
+    for frame in frames:
+        if sampler.should_infer(frame):
+            hands.process(frame)
+"""
+from typing import Optional
+
+import numpy as np
+
+MIN_STRIDE = 1  # infer every frame during motion when there is no backlog
+MAX_STRIDE = 8  # longest gap between inferences on a still picture, unloaded
+MOTION_THRESHOLD = 6.0  # mean absolute thumbnail difference (0-255) that counts as motion
+THUMB_STEP = 8  # thumbnail = every 8th pixel in both directions
+
+
+def thumbnail(frame: np.ndarray, step: int = THUMB_STEP) -> np.ndarray:
+    """Downscaled greyscale copy: strided view, channels summed (no resampling)."""
+    small = frame[::step, ::step]
+    if small.ndim == 3:
+        return small.sum(axis=2, dtype=np.int16) // small.shape[2]
+    return small.astype(np.int16)
+
+
+class FrameSampler:
+    def __init__(self, min_stride: int = MIN_STRIDE, max_stride: int = MAX_STRIDE,
+                 threshold: float = MOTION_THRESHOLD, step: int = THUMB_STEP):
+        self.min_stride = max(1, min_stride)
+        self.max_stride = max(self.min_stride, max_stride)
+        self.threshold = threshold
+        self.step = step
+        self.floor = self.min_stride
+        self.cap = self.max_stride
+        self._ref: Optional[np.ndarray] = None
+        self._since = 0
+        self.frames = 0
+        self.inferred = 0
+
+    def reset(self):
+        """New session: the next frame is always inferred."""
+        self._ref = None
+        self._since = 0
+
+    def start(self, pressure: float = 0.0):
+        """Set this chunk's stride bounds from the backlog (0 = none, 1 = at the budget)."""
+        pressure = min(1.0, max(0.0, pressure))
+        span = self.max_stride - self.min_stride
+        self.floor = self.min_stride + round(pressure * span / 2)
+        self.cap = self.max_stride + round(pressure * self.max_stride)
+
+    def should_infer(self, frame: np.ndarray) -> bool:
+        self.frames += 1
+        self._since += 1
+        if self._ref is not None and self._since < self.floor:
+            return False
+        thumb = thumbnail(frame, self.step)
+        if (self._ref is not None and self._ref.shape == thumb.shape and self._since < self.cap
+                and np.abs(thumb - self._ref).mean() < self.threshold):
+            return False
+        self._ref = thumb
+        self._since = 0
+        self.inferred += 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "inferred": self.inferred,
+            "floor": self.floor,
+            "cap": self.cap,
+        }
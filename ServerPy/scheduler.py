@@ -0,0 +1,311 @@
+"""One thread, one heap: timed and recurring pin actions without a sleeping thread each.
+
+    sched = PinScheduler(CommandMultiplexer(ESP32Interactor()))
+    sched.call_later(5, lambda esp: esp.set_pin_state(13, 0))
+    beat = sched.every(1.0, lambda esp: esp.pulse(12, 1, 100))
+    sched.cron("30 7 * * 1-5", lambda esp: esp.set_pin_state(14, 1))  # weekdays 07:30
+    sched.cancel(beat)
+
+Actions receive the scheduler's target (an interactor, CommandMultiplexer or
+DeviceFleet) and run on a small worker pool, so a slow board delays only its
+own action, never the timer thread.
+"""
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from interactor import ESP32Interactor, logger
+
+SCHEDULER_WORKERS = 8
+LATENESS_WINDOW = 4096  # recent runs kept for the lateness percentiles
+
+Action = Callable[[Any], Any]
+
+
+class CronSpec:
+    """Five-field cron expression: minute hour day-of-month month day-of-week.
+
+    Fields accept *, n, a-b, */n, a-b/n and comma lists; day-of-week 0 (or 7)
+    is Sunday. As in cron, if both day fields are restricted a day matching
+    either one fires.
+    """
+
+    _RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expr: str):
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got {expr!r}")
+        self.expr = expr
+        parsed = [self._parse(field, lo, hi) for field, (lo, hi) in zip(fields, self._RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {d % 7 for d in weekdays}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def _parse(field: str, lo: int, hi: int) -> set:
+        values = set()
+        for part in field.split(","):
+            span, _, step = part.partition("/")
+            if span == "*":
+                start, stop = lo, hi
+            elif "-" in span:
+                start, stop = map(int, span.split("-"))
+            else:
+                start = stop = int(span)
+                if step:
+                    stop = hi
+            step = int(step) if step else 1
+            if not (lo <= start <= stop <= hi) or step < 1:
+                raise ValueError(f"Cron field {field!r} is outside {lo}-{hi}")
+            values.update(range(start, stop + 1, step))
+        return values
+
+    def _day_matches(self, dt: datetime) -> bool:
+        in_month = dt.day in self.days
+        in_week = (dt.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return in_month and in_week
+        return in_month or in_week
+
+    def next_after(self, dt: datetime) -> datetime:
+        """First matching minute strictly after `dt`."""
+        dt = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt.year + 5
+        while dt.year <= limit:
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+            elif dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt
+        raise ValueError(f"Cron expression {self.expr!r} never fires")
+
+
+class _Job:
+    __slots__ = ("id", "action", "due", "interval", "cron", "wall", "running", "cancelled")
+
+    def __init__(self, job_id: int, action: Action, due: float,
+                 interval: Optional[float] = None, cron: Optional[CronSpec] = None,
+                 wall: Optional[datetime] = None):
+        self.id = job_id
+        self.action = action
+        self.due = due
+        self.interval = interval
+        self.cron = cron
+        self.wall = wall  # wall-clock time of the next cron run
+        self.running = False
+        self.cancelled = False
+
+
+def _cron_due(wall: datetime) -> float:
+    """Monotonic deadline for a local wall-clock time."""
+    return time.monotonic() + (wall.timestamp() - time.time())
+
+
+class PinScheduler:
+    """Priority queue of timed actions served by a single timer thread.
+
+    Deadlines are absolute monotonic times, and a recurring job's next run is
+    its previous deadline plus the interval, so timing does not drift with
+    the time each run takes. A recurring job that is still running, or that
+    the scheduler fell a whole interval behind on, skips that occurrence
+    instead of queueing a burst. Cancelled jobs are dropped lazily when they
+    reach the top of the heap.
+
+    Actions run on `workers` threads, so the target must be safe to call
+    concurrently; a bare ESP32Interactor is put behind a CommandMultiplexer.
+    """
+
+    def __init__(self, target, workers: int = SCHEDULER_WORKERS):
+        self._owned = None
+        if isinstance(target, ESP32Interactor):
+            from mux import CommandMultiplexer
+            target = self._owned = CommandMultiplexer(target)
+        self.target = target
+        self._heap: List[tuple] = []
+        self._jobs: Dict[int, _Job] = {}
+        self._ids = itertools.count(1)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._stale = 0
+        self._lateness = deque(maxlen=LATENESS_WINDOW)
+        self.max_lateness = 0.0
+        self.runs = 0
+        self.failed = 0
+        self.skipped = 0
+        self.cancelled = 0
+        self._pool = ThreadPoolExecutor(max(1, workers), thread_name_prefix="scheduler")
+        self._thread = threading.Thread(target=self._run, name="pin-scheduler", daemon=True)
+        self._thread.start()
+
+    # -- scheduling ------------------------------------------------------------
+
+    def _add(self, action: Action, due: float, **kwargs) -> int:
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Scheduler is closed.")
+            job = _Job(next(self._ids), action, due, **kwargs)
+            self._jobs[job.id] = job
+            heapq.heappush(self._heap, (due, next(self._seq), job))
+            if self._heap[0][2] is job:
+                # New earliest deadline: the timer thread has to wake sooner
+                self._cond.notify()
+        return job.id
+
+    def call_at(self, when: float, action: Action) -> int:
+        """Run once at `when` (a time.monotonic() value); returns the job id."""
+        return self._add(action, when)
+
+    def call_later(self, delay: float, action: Action) -> int:
+        return self._add(action, time.monotonic() + delay)
+
+    def every(self, interval: float, action: Action, first: Optional[float] = None) -> int:
+        """Run every `interval` seconds, the first time after `first` seconds (default: interval)."""
+        if interval <= 0:
+            raise ValueError("Interval must be positive.")
+        delay = interval if first is None else first
+        return self._add(action, time.monotonic() + delay, interval=interval)
+
+    def cron(self, expr: str, action: Action) -> int:
+        """Run at every local time matching a five-field cron expression."""
+        spec = CronSpec(expr)
+        wall = spec.next_after(datetime.now())
+        return self._add(action, _cron_due(wall), cron=spec, wall=wall)
+
+    def cancel(self, job_id: int) -> bool:
+        """Stop a pending or recurring job; False if it already finished or never existed."""
+        with self._cond:
+            job = self._jobs.pop(job_id, None)
+            if job is None:
+                return False
+            job.cancelled = True
+            self.cancelled += 1
+            self._stale += 1
+            if self._stale > 64 and self._stale > len(self._heap) // 2:
+                # In place: the timer thread holds a reference to this list
+                self._heap[:] = [entry for entry in self._heap if not entry[2].cancelled]
+                heapq.heapify(self._heap)
+                self._stale = 0
+        return True
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._jobs)
+
+    # -- timer thread ------------------------------------------------------------
+
+    def _next_due(self) -> Optional[_Job]:
+        """Wait for the earliest live job to come due; None once closed."""
+        heap = self._heap
+        while not self._closed:
+            while heap and heap[0][2].cancelled:
+                heapq.heappop(heap)
+                self._stale -= 1
+            if not heap:
+                self._cond.wait()
+                continue
+            wait = heap[0][0] - time.monotonic()
+            if wait > 0:
+                self._cond.wait(wait)
+                continue
+            return heapq.heappop(heap)[2]
+        return None
+
+    def _reschedule(self, job: _Job, now: float):
+        if job.cron is not None:
+            job.wall = job.cron.next_after(max(job.wall, datetime.now()))
+            job.due = _cron_due(job.wall)
+        elif job.interval is not None:
+            job.due += job.interval
+            if job.due <= now:
+                missed = int((now - job.due) // job.interval) + 1
+                self.skipped += missed
+                job.due += missed * job.interval
+        else:
+            del self._jobs[job.id]
+            return
+        heapq.heappush(self._heap, (job.due, next(self._seq), job))
+
+    def _run(self):
+        while True:
+            with self._cond:
+                job = self._next_due()
+                if job is None:
+                    return
+                due = job.due
+                if job.running:
+                    # Previous run still busy: skip this occurrence rather than overlap
+                    self.skipped += 1
+                    self._reschedule(job, time.monotonic())
+                    continue
+                job.running = True
+                self._reschedule(job, time.monotonic())
+            self._pool.submit(self._call, job, due)
+
+    def _call(self, job: _Job, due: float):
+        late = time.monotonic() - due
+        try:
+            job.action(self.target)
+        except Exception as e:
+            with self._cond:
+                self.failed += 1
+            logger.warning(f"Scheduled job {job.id} failed: {e}")
+        finally:
+            with self._cond:
+                job.running = False
+                self.runs += 1
+                self._lateness.append(late)
+                self.max_lateness = max(self.max_lateness, late)
+
+    # -- reporting / shutdown ----------------------------------------------------
+
+    def stats(self) -> dict:
+        with self._cond:
+            recent = sorted(self._lateness)
+            pending = len(self._jobs)
+            runs, failed, skipped, cancelled = self.runs, self.failed, self.skipped, self.cancelled
+            worst = self.max_lateness
+
+        def pct(q):
+            if not recent:
+                return None
+            return round(recent[min(len(recent) - 1, int(q / 100 * len(recent)))] * 1e3, 3)
+
+        return {
+            "pending": pending,
+            "runs": runs,
+            "failed": failed,
+            "skipped": skipped,
+            "cancelled": cancelled,
+            "lateness_p50_ms": pct(50),
+            "lateness_p99_ms": pct(99),
+            "lateness_max_ms": round(worst * 1e3, 3),
+        }
+
+    def close(self, wait: bool = True):
+        """Stop the timer thread; pending jobs are dropped, running ones finish if `wait`."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=5)
+        self._pool.shutdown(wait=wait)
+        if self._owned is not None:
+            self._owned.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,8 +1,20 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Blueprint, Flask, Response, render_template, request, jsonify
+from events import StatusBroadcaster
 from interactor import ESP32Interactor
+from lazy import LazyInteractor
+from mux import CommandMultiplexer
+from status_cache import StatusCache
+from ws_control import register_control_socket
 
-app = Flask(__name__)
-esp = ESP32Interactor("192.168.137.230")
+ESP_HOST = "192.168.137.230"
+
+bp = Blueprint("server", __name__)
+# Flask serves requests on several threads; the multiplexer gives the board
+# socket a single owner so concurrent /control and /status calls can't
+# interleave their replies. The status cache lets every open dashboard share
+# one GETALL per TTL instead of each poll hitting the board. Nothing is
+# built until the first request needs the board.
+esp = LazyInteractor(lambda: StatusCache(CommandMultiplexer(ESP32Interactor(ESP_HOST))))
 
 DEVICE_PINS = {
     "light": 13,
@@ -10,11 +22,37 @@ DEVICE_PINS = {
     "door": 27
 }
 
-@app.route("/")
+
+def read_device_states():
+    """{device: state} for the dashboard, -1 for every device if the board can't be read."""
+    try:
+        pin_states = esp.get_all_pin_states(max_age=status_events.interval)
+        return {device: pin_states.get(pin, 0) for device, pin in DEVICE_PINS.items()}
+    except Exception:
+        return {dev: -1 for dev in DEVICE_PINS}
+
+
+# One shared poller feeds every /events client
+status_events = StatusBroadcaster(read_device_states)
+
+
+def apply_device_states(states):
+    """Write {device: state} to the board in one pipelined batch; returns {device: response}."""
+    unknown = [device for device in states if device not in DEVICE_PINS]
+    if unknown:
+        raise ValueError(f"Invalid device: {', '.join(unknown)}")
+    results = esp.set_pin_states({DEVICE_PINS[device]: state for device, state in states.items()})
+    responses = dict(zip(states, (response for _, _, response in results)))
+    status_events.publish({device: states[device] for device, response in responses.items()
+                           if "OK" in response})
+    return responses
+
+
+@bp.route("/")
 def index():
     return render_template("index.html")
 
-@app.route("/control", methods=["POST"])
+@bp.route("/control", methods=["POST"])
 def control():
     data = request.get_json()
     device = data["device"]
@@ -23,13 +61,13 @@ def control():
     
     if pin is not None:
         try:
-            esp.set_pin_state(pin, state)
+            apply_device_states({device: state})
             return jsonify({"success": True})
         except Exception as e:
             return jsonify({"success": False, "error": str(e)})
     return jsonify({"success": False, "error": "Invalid device"})
 
-@app.route("/status")
+@bp.route("/status")
 def status():
     try:
         pin_states = esp.get_all_pin_states()
@@ -41,8 +79,31 @@ def status():
     except Exception as e:
         return jsonify({dev: -1 for dev in DEVICE_PINS}, error=str(e))
 
+@bp.route("/events")
+def events():
+    return Response(status_events.stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@bp.route("/esp_stats")
+def esp_stats():
+    if not esp.created:
+        return jsonify({"status_cache": None, "events": status_events.stats()})
+    mux = esp.esp
+    return jsonify({"status_cache": esp.stats(), "mux": mux.stats(),
+                    "connection": mux.esp.conn.stats(), "events": status_events.stats()})
+
+
+def create_app():
+    """Build the dashboard app (`flask --app server run` finds this factory)."""
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    # Persistent control channel for the dashboard, when flask-sock is installed
+    register_control_socket(app, apply_device_states, status_events)
+    return app
+
+
 if __name__ == "__main__":
-    app.run(debug=True, port=5000)
+    create_app().run(debug=True, port=5000)
 
 
 # def web_server():
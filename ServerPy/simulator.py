@@ -0,0 +1,405 @@
+"""Pure-Python stand-in for the ESP/bootLoader/bootLoader.ino TCP server.
+
+Speaks the same line protocol with the same pin rules, so the Python side
+can be exercised and benchmarked without a board:
+
+    python simulator.py                       # one board on port 1234
+    python simulator.py --count 50 --port 2000 --profile wifi
+"""
+import argparse
+import logging
+import queue
+import random
+import re
+import socket
+import socketserver
+import threading
+import time
+from typing import Dict, List, Optional
+
+import binproto
+from interactor import ALLOWED_PINS
+
+logger = logging.getLogger("ESP32Simulator")
+
+DHT_PIN = 26
+INPUT_ONLY_PINS = (34, 35)
+
+# sscanf("%d %d") semantics: the first number must end before the second starts
+SET_COMMAND = re.compile(r"\s*([+-]?\d+)(?!\d)\s*([+-]?\d+)")
+# sscanf("SETMASK %u %u")
+SETMASK_COMMAND = re.compile(r"SETMASK\s+(\d+)\s+(\d+)")
+# sscanf("PULSE %d %d %lu")
+PULSE_COMMAND = re.compile(r"PULSE\s+([+-]?\d+)\s+([+-]?\d+)\s+(\d+)")
+
+
+class NetworkProfile:
+    """Injected delays and faults.
+
+    latency/jitter:   round-trip network delay added to each reply (uniform +/- jitter);
+                      replies to pipelined commands are delayed concurrently, like packets
+    processing:       seconds the board spends on each command, one command at a time
+    drop_rate:        probability a response is never sent
+    disconnect_rate:  probability the board closes the connection instead of replying
+    dht_delay:        extra seconds a GETALL spends reading the DHT11
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, processing: float = 0.0,
+                 drop_rate: float = 0.0, disconnect_rate: float = 0.0, dht_delay: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.processing = processing
+        self.drop_rate = drop_rate
+        self.disconnect_rate = disconnect_rate
+        self.dht_delay = dht_delay
+
+    def __repr__(self):
+        return (f"NetworkProfile(latency={self.latency}, jitter={self.jitter}, "
+                f"processing={self.processing}, drop_rate={self.drop_rate}, "
+                f"disconnect_rate={self.disconnect_rate}, dht_delay={self.dht_delay})")
+
+
+PROFILES: Dict[str, NetworkProfile] = {
+    "loopback": NetworkProfile(),
+    "lan": NetworkProfile(latency=0.001, jitter=0.0005, processing=0.0002),
+    "wifi": NetworkProfile(latency=0.008, jitter=0.005, processing=0.0005, dht_delay=0.025),
+    "flaky": NetworkProfile(latency=0.015, jitter=0.015, processing=0.0005, drop_rate=0.01,
+                            disconnect_rate=0.005, dht_delay=0.025),
+}
+
+
+class _BoardHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        if self.server.simulator.nodelay:
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._outbox: Optional[queue.Queue] = None
+        self._last_due = 0.0
+
+    def handle(self):
+        sim: "ESP32Simulator" = self.server.simulator
+        sim.stats["connections"] += 1
+        profile = sim.profile
+        if profile.latency or profile.jitter:
+            self._outbox = queue.Queue()
+            threading.Thread(target=self._deliver, daemon=True).start()
+        try:
+            binary = False
+            while True:
+                if binary:
+                    opcode = self.rfile.read(1)
+                    if not opcode:
+                        return
+                    size = binproto.REQUEST_SIZES.get(opcode[0], binproto.REQUEST.size)
+                    request = opcode + self.rfile.read(size - 1)
+                    if len(request) < size:
+                        return
+                    sim.stats["bytes_in"] += len(request)
+                    action, reply = sim.handle_binary(request)
+                    # The board switches modes even if the reply gets lost
+                    binary = request[0] != binproto.OP_TEXT
+                else:
+                    raw = self.rfile.readline()
+                    if not raw:
+                        return
+                    sim.stats["bytes_in"] += len(raw)
+                    line = raw.decode(errors="replace")
+                    action, reply = sim.handle_line(line)
+                    binary = sim.accepts_handshake(line)
+                if action == "disconnect":
+                    return
+                if action == "reply":
+                    self._send(reply)
+        finally:
+            if self._outbox is not None:
+                self._outbox.put(None)
+
+    def _send(self, reply: bytes):
+        self.server.simulator.stats["bytes_out"] += len(reply)
+        if self._outbox is None:
+            self.wfile.write(reply)
+            return
+        # Replies leave in order, each no earlier than its own network delay
+        due = time.monotonic() + self.server.simulator.network_delay()
+        self._last_due = max(due, self._last_due)
+        self._outbox.put((self._last_due, reply))
+
+    def _deliver(self):
+        while True:
+            item = self._outbox.get()
+            if item is None:
+                return
+            due, data = item
+            wait = due - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                self.wfile.write(data)
+            except (OSError, ValueError):
+                return
+
+
+class _ThreadingServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class ESP32Simulator:
+    """One simulated board. Use port=0 to pick a free port."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 1234,
+                 profile: Optional[NetworkProfile] = None,
+                 temperature: float = 24.0, humidity: float = 40.0,
+                 seed: Optional[int] = None, nodelay: bool = True, binary: bool = True,
+                 setmask: bool = True, pulse: bool = True):
+        self.profile = profile or PROFILES["loopback"]
+        # binary=False / setmask=False / pulse=False behave like firmware that
+        # predates those commands
+        self.binary = binary
+        self.setmask = setmask
+        self.pulse = pulse
+        self.temperature = temperature
+        self.humidity = humidity
+        self.nodelay = nodelay
+        self.rng = random.Random(seed)
+        # Every allowed pin except the DHT data pin is reported by GETALL;
+        # input-only pins read whatever the test sets here.
+        self.pins: Dict[int, int] = {pin: 0 for pin in ALLOWED_PINS if pin != DHT_PIN}
+        self.stats = {"connections": 0, "commands": 0, "dropped": 0, "disconnects": 0,
+                      "bytes_in": 0, "bytes_out": 0}
+        self._lock = threading.Lock()
+        # pin -> timer that reverts a running pulse
+        self._pulses: Dict[int, threading.Timer] = {}
+        self._server = _ThreadingServer((host, port), _BoardHandler, bind_and_activate=True)
+        self._server.simulator = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self):
+        return self._server.server_address
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @staticmethod
+    def is_valid_pin(pin: int) -> bool:
+        return pin in ALLOWED_PINS and pin != DHT_PIN and pin not in INPUT_ONLY_PINS
+
+    def network_delay(self) -> float:
+        profile = self.profile
+        delay = profile.latency
+        if profile.jitter:
+            delay += self.rng.uniform(-profile.jitter, profile.jitter)
+        return max(0.0, delay)
+
+    def _delay(self, extra: float = 0.0):
+        delay = self.profile.processing + extra
+        if delay > 0:
+            time.sleep(delay)
+
+    def apply_mask(self, mask: int, values: int) -> bool:
+        """SETMASK: validate every masked pin first, then switch them all under one lock."""
+        if mask >> len(ALLOWED_PINS):
+            return False
+        pins = [(pin, (values >> i) & 1) for i, pin in enumerate(ALLOWED_PINS) if (mask >> i) & 1]
+        if not all(self.is_valid_pin(pin) for pin, _ in pins):
+            return False
+        self.write_pins(pins)
+        return True
+
+    def write_pins(self, pins):
+        """Set (pin, level) pairs; like the firmware, a write cancels that pin's pending revert."""
+        with self._lock:
+            for pin, state in pins:
+                timer = self._pulses.pop(pin, None)
+                if timer:
+                    timer.cancel()
+                self.pins[pin] = state
+
+    def start_pulse(self, pin: int, state: int, duration_ms: int) -> bool:
+        """PULSE: drive the pin now and switch it to 1 - state after duration_ms."""
+        if not (self.is_valid_pin(pin) and state in (0, 1) and 1 <= duration_ms <= 65535):
+            return False
+        timer = threading.Timer(duration_ms / 1000, self._end_pulse, (pin, 1 - state))
+        timer.daemon = True
+        with self._lock:
+            previous = self._pulses.pop(pin, None)
+            if previous:
+                previous.cancel()
+            self.pins[pin] = state
+            self._pulses[pin] = timer
+            timer.start()
+        return True
+
+    def _end_pulse(self, pin: int, state: int):
+        with self._lock:
+            if self._pulses.get(pin) is threading.current_thread():
+                del self._pulses[pin]
+                self.pins[pin] = state
+
+    def execute(self, data: str) -> str:
+        """Run one trimmed command against the pin table, as loop() does."""
+        if data.upper() == "GETALL":
+            self._delay(self.profile.dht_delay)
+            with self._lock:
+                pins = "".join(f"{pin}:{val}," for pin, val in self.pins.items())
+            return f"{pins}TEMP:{self.temperature:f},HUM:{self.humidity:f}\n"
+
+        match = self.setmask and SETMASK_COMMAND.fullmatch(data)
+        if match:
+            self._delay()
+            if self.apply_mask(int(match.group(1)), int(match.group(2))):
+                return "OK\r\n"
+            return "Invalid pin or state\r\n"
+
+        match = self.pulse and PULSE_COMMAND.fullmatch(data)
+        if match:
+            self._delay()
+            if self.start_pulse(*map(int, match.groups())):
+                return "OK\r\n"
+            return "Invalid pin or state\r\n"
+
+        match = SET_COMMAND.match(data)
+        if match:
+            self._delay()
+            pin, state = int(match.group(1)), int(match.group(2))
+            if self.is_valid_pin(pin) and state in (0, 1):
+                self.write_pins([(pin, state)])
+                return "OK\r\n"
+            return "Invalid pin or state\r\n"
+
+        self._delay()
+        return "Invalid format. Use: <pin> <state> or GETALL\r\n"
+
+    def execute_binary(self, request: bytes) -> bytes:
+        """Run one binproto request against the pin table."""
+        opcode = request[0]
+        if opcode == binproto.OP_SETMASK and self.setmask:
+            self._delay()
+            _, mask, values = binproto.MASK_REQUEST.unpack(request)
+            ok = self.apply_mask(mask, values)
+            return binproto.STATUS.pack(binproto.STATUS_OK if ok else binproto.STATUS_INVALID)
+        if opcode == binproto.OP_PULSE and self.pulse:
+            self._delay()
+            ok = self.start_pulse(*binproto.PULSE_REQUEST.unpack(request)[1:])
+            return binproto.STATUS.pack(binproto.STATUS_OK if ok else binproto.STATUS_INVALID)
+        _, arg0, arg1 = binproto.REQUEST.unpack(request[:binproto.REQUEST.size])
+        if opcode == binproto.OP_GETALL:
+            self._delay(self.profile.dht_delay)
+            with self._lock:
+                pins = dict(self.pins)
+            return binproto.encode_snapshot(pins, self.temperature, self.humidity)
+        self._delay()
+        if opcode == binproto.OP_SET:
+            if self.is_valid_pin(arg0) and arg1 in (0, 1):
+                self.write_pins([(arg0, arg1)])
+                return binproto.STATUS.pack(binproto.STATUS_OK)
+            return binproto.STATUS.pack(binproto.STATUS_INVALID)
+        if opcode == binproto.OP_TEXT:
+            return binproto.STATUS.pack(binproto.STATUS_OK)
+        return binproto.STATUS.pack(binproto.STATUS_UNKNOWN_OP)
+
+    def accepts_handshake(self, line: str) -> bool:
+        return self.binary and line.strip() == binproto.HANDSHAKE.decode().strip()
+
+    def _faults(self, run):
+        """Apply the profile's disconnect/drop faults around one command."""
+        self.stats["commands"] += 1
+        profile = self.profile
+        if profile.disconnect_rate and self.rng.random() < profile.disconnect_rate:
+            self.stats["disconnects"] += 1
+            return "disconnect", None
+        reply = run()
+        if profile.drop_rate and self.rng.random() < profile.drop_rate:
+            self.stats["dropped"] += 1
+            return "drop", None
+        return "reply", reply
+
+    def handle_line(self, line: str):
+        """Return ("reply", bytes), ("drop", None) or ("disconnect", None)."""
+        if self.accepts_handshake(line):
+            return self._faults(lambda: f"{binproto.HANDSHAKE_OK}\r\n".encode())
+        return self._faults(lambda: self.execute(line.strip()).encode())
+
+    def handle_binary(self, request: bytes):
+        """Binary-mode counterpart of handle_line."""
+        return self._faults(lambda: self.execute_binary(request))
+
+    def start(self) -> "ESP32Simulator":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name=f"esp32-sim-{self.port}", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Simulated ESP32 listening on {self.address[0]}:{self.port}")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        with self._lock:
+            for timer in self._pulses.values():
+                timer.cancel()
+            self._pulses.clear()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def start_simulators(count: int, base_port: int = 1234, host: str = "127.0.0.1",
+                     profile: Optional[NetworkProfile] = None,
+                     seed: Optional[int] = None, binary: bool = True) -> List[ESP32Simulator]:
+    """Start `count` boards on consecutive ports (or free ports if base_port is 0)."""
+    sims = []
+    for i in range(count):
+        port = base_port + i if base_port else 0
+        sim_seed = None if seed is None else seed + i
+        sims.append(ESP32Simulator(host, port, profile, seed=sim_seed, binary=binary).start())
+    return sims
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated ESP32 boards")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1234)
+    parser.add_argument("--count", type=int, default=1)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="loopback")
+    parser.add_argument("--latency", type=float, help="override profile latency (s)")
+    parser.add_argument("--jitter", type=float, help="override profile jitter (s)")
+    parser.add_argument("--processing", type=float, help="override per-command board time (s)")
+    parser.add_argument("--drop-rate", type=float)
+    parser.add_argument("--disconnect-rate", type=float)
+    parser.add_argument("--dht-delay", type=float)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--text-only", action="store_true",
+                        help="refuse the binary protocol, like older firmware")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    base = PROFILES[args.profile]
+    profile = NetworkProfile(
+        latency=base.latency if args.latency is None else args.latency,
+        jitter=base.jitter if args.jitter is None else args.jitter,
+        processing=base.processing if args.processing is None else args.processing,
+        drop_rate=base.drop_rate if args.drop_rate is None else args.drop_rate,
+        disconnect_rate=base.disconnect_rate if args.disconnect_rate is None else args.disconnect_rate,
+        dht_delay=base.dht_delay if args.dht_delay is None else args.dht_delay,
+    )
+    sims = start_simulators(args.count, args.port, args.host, profile, args.seed,
+                            binary=not args.text_only)
+    logger.info(f"{len(sims)} board(s) running with {profile} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        for sim in sims:
+            sim.stop()
+
+
+if __name__ == "__main__":
+    main()
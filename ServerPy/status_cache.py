@@ -0,0 +1,227 @@
+import asyncio
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from interactor import logger
+
+STATUS_TTL = 1.0  # seconds a GETALL result is served from cache
+
+
+class _StatusCacheBase:
+    """TTL bookkeeping shared by the thread and asyncio caches."""
+
+    def __init__(self, esp, ttl: float = STATUS_TTL):
+        self.esp = esp
+        self.ttl = ttl
+        self._value = None
+        self._fetched_at = 0.0
+        # Bumped by every acknowledged write, so a GETALL that was already in
+        # flight when a pin changed is not cached over the newer state
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.joined = 0
+        self.errors = 0
+
+    @property
+    def pin_states(self):
+        return self.esp.pin_states
+
+    def _fresh(self, max_age: Optional[float]):
+        ttl = self.ttl if max_age is None else max_age
+        if self._value is not None and time.monotonic() - self._fetched_at < ttl:
+            self.hits += 1
+            return self._value
+        return None
+
+    def _store(self, value, generation: int):
+        if generation == self._generation:
+            self._value = value
+            self._fetched_at = time.monotonic()
+
+    def _apply(self, acked: List[Tuple[int, int]]):
+        """Patch the cached snapshot with acknowledged writes instead of refetching."""
+        if not acked:
+            return
+        self._generation += 1
+        if self._value is not None:
+            # Copy: callers may still hold the old snapshot
+            self._value = self._value.with_states(acked)
+
+    def invalidate(self):
+        self._generation += 1
+        self._value = None
+
+    def stats(self) -> dict:
+        age = time.monotonic() - self._fetched_at if self._value is not None else None
+        return {
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "joined": self.joined,
+            "errors": self.errors,
+            "age_s": None if age is None else round(age, 3),
+        }
+
+
+class _Flight:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class StatusCache(_StatusCacheBase):
+    """Read-through cache for GETALL in front of an interactor or CommandMultiplexer.
+
+    Reads younger than `ttl` are served from memory. When the snapshot is
+    stale, the first caller fetches it and every concurrent caller waits
+    for that same GETALL (single flight). Writes made through the cache
+    patch the snapshot from the board's acknowledgements.
+    Snapshots are shared between callers; treat them as read-only.
+    """
+
+    def __init__(self, esp, ttl: float = STATUS_TTL):
+        super().__init__(esp, ttl)
+        self._lock = threading.Lock()
+        self._flight: Optional[_Flight] = None
+
+    def get_all_pin_states(self, max_age: Optional[float] = None):
+        with self._lock:
+            value = self._fresh(max_age)
+            if value is not None:
+                return value
+            flight = self._flight
+            if flight is None:
+                flight = self._flight = _Flight()
+                generation = self._generation
+                self.misses += 1
+                leader = True
+            else:
+                self.joined += 1
+                leader = False
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = self.esp.get_all_pin_states()
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self.errors += 1
+            logger.warning(f"GETALL for status cache failed: {e}")
+            raise
+        else:
+            with self._lock:
+                self._store(flight.value, generation)
+            return flight.value
+        finally:
+            with self._lock:
+                self._flight = None
+            flight.done.set()
+
+    def set_pin_state(self, pin: int, state: int):
+        response = self.esp.set_pin_state(pin, state)
+        if "OK" in response:
+            with self._lock:
+                self._apply([(pin, state)])
+        return response
+
+    def set_pin_states(self, commands):
+        results = self.esp.set_pin_states(commands)
+        with self._lock:
+            self._apply([(pin, state) for pin, state, response in results if "OK" in response])
+        return results
+
+    def set_pins(self, states):
+        commands = list(states.items()) if isinstance(states, dict) else list(states)
+        response = self.esp.set_pins(commands)
+        if "OK" in response:
+            with self._lock:
+                self._apply(commands)
+        return response
+
+    def pulse(self, pin: int, state: int, duration_ms: int) -> str:
+        response = self.esp.pulse(pin, state, duration_ms)
+        if "OK" in response:
+            # The pin changes twice without further acks; just read it again next time
+            self.invalidate()
+        return response
+
+    def invalidate(self):
+        with self._lock:
+            super().invalidate()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return super().stats()
+
+    def disconnect(self):
+        self.esp.disconnect()
+
+
+class AsyncStatusCache(_StatusCacheBase):
+    """StatusCache for AsyncESP32Interactor: concurrent awaiters share one GETALL task."""
+
+    def __init__(self, esp, ttl: float = STATUS_TTL):
+        super().__init__(esp, ttl)
+        self._flight: Optional[asyncio.Future] = None
+
+    async def get_all_pin_states(self, max_age: Optional[float] = None):
+        value = self._fresh(max_age)
+        if value is not None:
+            return value
+        if self._flight is None:
+            self.misses += 1
+            self._flight = asyncio.ensure_future(self._fetch())
+        else:
+            self.joined += 1
+        # One caller giving up must not cancel the read the others are waiting on
+        return await asyncio.shield(self._flight)
+
+    async def _fetch(self):
+        generation = self._generation
+        try:
+            value = await self.esp.get_all_pin_states()
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"GETALL for status cache failed: {e}")
+            raise
+        finally:
+            self._flight = None
+        self._store(value, generation)
+        return value
+
+    async def set_pin_state(self, pin: int, state: int) -> str:
+        response = await self.esp.set_pin_state(pin, state)
+        if "OK" in response:
+            self._apply([(pin, state)])
+        return response
+
+    async def set_pin_states(self, commands):
+        results = await self.esp.set_pin_states(commands)
+        self._apply([(pin, state) for pin, state, response in results if "OK" in response])
+        return results
+
+    async def set_pins(self, states) -> str:
+        commands = list(states.items()) if isinstance(states, dict) else list(states)
+        response = await self.esp.set_pins(commands)
+        if "OK" in response:
+            self._apply(commands)
+        return response
+
+    async def pulse(self, pin: int, state: int, duration_ms: int) -> str:
+        response = await self.esp.pulse(pin, state, duration_ms)
+        if "OK" in response:
+            self.invalidate()
+        return response
+
+    async def disconnect(self):
+        await self.esp.disconnect()
@@ -0,0 +1,152 @@
+"""Per-session state for live gesture streams.
+
+Chunks of one stream are uploaded independently, can arrive out of order
+and are analysed in parallel, so each StreamSession keeps:
+  * a reorder buffer: results are applied in chunk_id order, and a result
+    whose predecessor has not arrived is held up to REORDER_WINDOW seconds;
+  * the finger state the last applied chunk ended with, so a chunk boundary
+    does not re-send pins for fingers that did not move;
+  * the newest applied timestamp: a chunk older than that, or more than
+    MAX_CHUNK_LAG behind the newest chunk seen, is dropped as late.
+
+Sessions are not thread-safe; GesturePool calls them under its lock.
+"""
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+REORDER_WINDOW = 0.5  # seconds a result waits for a missing predecessor
+MAX_CHUNK_LAG = 3.0  # seconds a chunk may trail the newest one of its stream
+SESSION_TTL = 300.0  # seconds before an idle session is forgotten
+
+PinCommand = Tuple[int, int]
+
+
+class LateChunk(Exception):
+    """A chunk dropped because newer chunks of its stream were already applied."""
+
+
+def parse_timestamp(value) -> Optional[float]:
+    """Seconds since the epoch from the client's ISO-8601 timestamp, or None."""
+    if not value:
+        return None
+    try:
+        # fromisoformat() only accepts the "Z" suffix from Python 3.11
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def chunk_number(chunk_id) -> Optional[int]:
+    try:
+        return int(chunk_id)
+    except (TypeError, ValueError):
+        return None
+
+
+class StreamSession:
+    def __init__(self, session_id, fingers: int = 5):
+        self.session_id = session_id
+        self.fingers = fingers
+        self.last_state = [0] * fingers
+        self.applied_through = 0  # highest chunk number applied
+        self.applied_ts: Optional[float] = None
+        self.newest_ts: Optional[float] = None
+        self.inflight: Set[int] = set()
+        self.done: Dict[int, Tuple[float, Any]] = {}  # chunk number -> (completed at, result)
+        self.touched = time.monotonic()
+        self.timer = None  # pending REORDER_WINDOW flush, owned by GesturePool
+        self.chunks = 0
+        self.late = 0
+        self.commands = 0
+        self.seconds = 0.0
+
+    def restarted_by(self, chunk_id, timestamp) -> bool:
+        """True if this chunk starts a new stream under the same session id
+        (a client that does not send one); the caller then opens a new session
+        while this one finishes its own chunks."""
+        if chunk_number(chunk_id) != 1 or not (self.applied_through or self.inflight or self.done):
+            return False
+        ts = parse_timestamp(timestamp)
+        return ts is None or self.newest_ts is None or ts > self.newest_ts
+
+    def admit(self, chunk_id, timestamp) -> Tuple[int, Optional[str]]:
+        """Register an incoming chunk: (its chunk number, why it is late or None)."""
+        self.touched = time.monotonic()
+        number = chunk_number(chunk_id)
+        ts = parse_timestamp(timestamp)
+        reason = None
+        if ts is not None and self.applied_ts is not None and ts < self.applied_ts:
+            reason = "older than a chunk already applied"
+        elif ts is not None and self.newest_ts is not None and self.newest_ts - ts > MAX_CHUNK_LAG:
+            reason = f"more than {MAX_CHUNK_LAG} s behind the stream"
+        else:
+            if number is None:
+                # Unnumbered chunks go after everything seen so far
+                number = max([self.applied_through, *self.inflight, *self.done]) + 1
+            elif number <= self.applied_through:
+                reason = f"chunk {number} arrived after chunk {self.applied_through} was applied"
+            elif number in self.inflight or number in self.done:
+                reason = f"chunk {number} is a duplicate"
+        if reason is not None:
+            self.late += 1
+            return number or 0, reason
+        if ts is not None:
+            self.newest_ts = ts if self.newest_ts is None else max(self.newest_ts, ts)
+        self.inflight.add(number)
+        self.chunks += 1
+        return number, None
+
+    def complete(self, number: int, result):
+        self.inflight.discard(number)
+        self.done[number] = (time.monotonic(), result)
+
+    def release(self) -> Tuple[List[Any], Optional[float]]:
+        """Results now due in chunk order, and when to look again for held ones (or None)."""
+        ready = []
+        now = time.monotonic()
+        while self.done:
+            number = min(self.done)
+            if self.inflight and min(self.inflight) < number:
+                # An earlier chunk is still being analysed; it will release this one
+                return ready, None
+            completed_at, result = self.done[number]
+            wait = completed_at + REORDER_WINDOW - now
+            if number != self.applied_through + 1 and wait > 0:
+                # A predecessor may still be on its way from the client
+                return ready, wait
+            del self.done[number]
+            self.applied_through = number
+            ready.append(result)
+        return ready, None
+
+    def applied(self, timestamp, seconds: float = 0.0):
+        """Record a chunk's application (after release, in order)."""
+        ts = parse_timestamp(timestamp)
+        if ts is not None:
+            self.applied_ts = ts if self.applied_ts is None else max(self.applied_ts, ts)
+        self.seconds += seconds
+
+    def changes(self, states: List[List[int]], pins: Dict[int, int]) -> List[PinCommand]:
+        """Pin writes for a chunk's per-frame finger states, relative to the carried state."""
+        commands = []
+        last = self.last_state
+        for frame_states in states:
+            for i, state in enumerate(frame_states):
+                if state != last[i]:
+                    commands.append((pins[i], state))
+            last = list(frame_states)
+        self.last_state = last
+        self.commands += len(commands)
+        return commands
+
+    def stats(self) -> dict:
+        return {
+            "chunks": self.chunks,
+            "late": self.late,
+            "applied_through": self.applied_through,
+            "waiting": len(self.inflight) + len(self.done),
+            "commands": self.commands,
+            "video_seconds": round(self.seconds, 1),
+            "commands_per_minute": round(self.commands * 60 / self.seconds, 1) if self.seconds else None,
+        }
@@ -1,6 +1,9 @@
 from telegram.ext import Updater, CommandHandler, MessageHandler, Filters
 from telegram.utils.request import Request
 from interactor import ESP32Interactor
+from lazy import LazyInteractor
+from mux import CommandMultiplexer
+from status_cache import StatusCache
 import requests
 import random
 import time
@@ -11,8 +14,9 @@ import os
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# ESP setup
-esp = ESP32Interactor()
+# ESP setup (shared by handler threads through one socket owner); board
+# discovery runs on the first command, not at import
+esp = LazyInteractor(lambda: StatusCache(CommandMultiplexer(ESP32Interactor())))
 
 # Device and pin mapping
 DEVICE_PINS = {
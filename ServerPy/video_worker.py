@@ -0,0 +1,506 @@
+"""Gesture recognition on uploaded video chunks, with long-lived resources.
+
+Loading the MediaPipe hand model and finding and connecting to the board
+cost more than analysing a ~1 s chunk, so a GestureWorker creates both on
+its first chunk and keeps them for its lifetime. A chunk from a different
+session resets the worker: MediaPipe forgets the hand it was tracking and
+pending pin writes are flushed, but the model and the connection stay.
+
+    worker = GestureWorker()
+    worker.process("uploads/live_chunk_3.webm", session_id="a1")
+    worker.close()
+
+GesturePool spreads chunks over worker processes (inference is CPU-bound)
+and applies their pin commands through one connection, in chunk_id order
+per session (see streams.py):
+
+    pool = GesturePool(processes=4)
+    pool.submit("uploads/live_chunk_3.webm", chunk_id=3, timestamp=ts, session_id="a1")
+"""
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import BrokenExecutor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from chunks import chunk_path
+from coalesce import CoalescingWriter
+from interactor import ESP32Interactor
+from sampler import FrameSampler
+from streams import SESSION_TTL, LateChunk, StreamSession
+
+logger = logging.getLogger(__name__)
+
+# ESP32 Pin mapping (adjust according to your setup)
+FINGER_TO_PIN = {
+    0: 13,  # Thumb
+    1: 12,  # Index
+    2: 14,  # Middle
+    3: 27,  # Ring
+    4: 25,   # Pinky
+}
+
+# Merge per-frame pin writes before they reach the board; None sends every write
+COALESCE_WINDOW = 0.05  # seconds
+MIN_PIN_INTERVAL = 0.1  # seconds between writes to the same pin
+
+OVERHEAD_WINDOW = 256  # recent chunks kept for the setup-time percentiles
+INFLIGHT_PER_PROCESS = 2  # chunks handed to the pool per process before submit() blocks
+
+PinCommand = Tuple[int, int]
+FingerStates = List[List[int]]  # finger states of each analysed frame that showed a hand
+
+
+@lru_cache(maxsize=None)
+def load_vision():
+    """
+    Import OpenCV and MediaPipe on first use; together they take seconds to load
+    """
+    import cv2
+    import mediapipe as mp
+    return cv2, mp.solutions.hands
+
+
+def get_finger_states(landmarks):
+    """Extract finger states from MediaPipe hand landmarks"""
+    # Finger tip and pip landmark indices
+    FINGER_TIPS = [4, 8, 12, 16, 20]  # Thumb, Index, Middle, Ring, Pinky
+    FINGER_PIPS = [3, 6, 10, 14, 18]  # PIP joints for each finger
+
+    states = []
+
+    for i, (tip, pip) in enumerate(zip(FINGER_TIPS, FINGER_PIPS)):
+        if i == 0:  # Thumb (different logic due to orientation)
+            # Thumb is extended if tip x-coordinate > pip x-coordinate
+            is_extended = landmarks.landmark[tip].x > landmarks.landmark[pip].x
+        else:  # Other fingers
+            # Finger is extended if tip y-coordinate < pip y-coordinate
+            is_extended = landmarks.landmark[tip].y < landmarks.landmark[pip].y
+
+        states.append(1 if is_extended else 0)
+
+    return states
+
+
+def open_board(host: str = "", port: int = 1234,
+               coalesce_window: Optional[float] = COALESCE_WINDOW,
+               min_pin_interval: float = MIN_PIN_INTERVAL):
+    """Interactor (behind a CoalescingWriter unless the window is None) for gesture pin writes."""
+    esp = ESP32Interactor(host, port)
+    try:
+        esp.connect()
+    except OSError as e:
+        # The connection manager keeps retrying; writes fail until it is back
+        logger.warning(f"ESP32 not reachable yet: {e}")
+    if coalesce_window is not None:
+        esp = CoalescingWriter(esp, coalesce_window, min_pin_interval)
+    return esp
+
+
+class GestureWorker:
+    """Analyses chunks with one Hands instance and one board connection.
+
+    Not thread-safe: each worker belongs to one processing thread. With
+    persistent=False every chunk builds and tears down its own Hands and
+    interactor, as the worker used to; benchmark.py uses that as baseline.
+    """
+
+    def __init__(self, host: str = "", port: int = 1234, persistent: bool = True,
+                 coalesce_window: Optional[float] = COALESCE_WINDOW,
+                 min_pin_interval: float = MIN_PIN_INTERVAL):
+        self.host = host
+        self.port = port
+        self.persistent = persistent
+        self.coalesce_window = coalesce_window
+        self.min_pin_interval = min_pin_interval
+        self.session_id = None
+        self.last_state = [0] * len(FINGER_TO_PIN)  # carried across a session's chunks
+        self.sampler = FrameSampler()
+        self._hands = None
+        self._esp = None
+        self._setup = deque(maxlen=OVERHEAD_WINDOW)
+        self.chunks = 0
+        self.frames = 0
+        self.resets = 0
+
+    # -- resources ---------------------------------------------------------------
+
+    def _open_hands(self):
+        _, mp_hands = load_vision()
+        return mp_hands.Hands(
+            static_image_mode=False,
+            max_num_hands=1,
+            min_detection_confidence=0.6,
+            min_tracking_confidence=0.5
+        )
+
+    def _acquire(self, board: bool = True):
+        if self._hands is None:
+            self._hands = self._open_hands()
+        if board and self._esp is None:
+            self._esp = open_board(self.host, self.port, self.coalesce_window, self.min_pin_interval)
+
+    def _release(self):
+        if self._hands is not None:
+            self._hands.close()
+            self._hands = None
+        if self._esp is not None:
+            self._esp.disconnect()
+            self._esp = None
+
+    def reset(self, session_id=None):
+        """Start an unrelated session: drop the tracked hand and finger state, send pending pin writes."""
+        self.last_state = [0] * len(FINGER_TO_PIN)
+        self.sampler.reset()
+        if self._hands is not None:
+            self._hands.reset()
+        if isinstance(self._esp, CoalescingWriter):
+            self._esp.flush()
+        self.session_id = session_id
+        self.resets += 1
+
+    # -- processing --------------------------------------------------------------
+
+    def process(self, video, session_id=None, pressure: float = 0.0) -> int:
+        """Analyse one chunk (a path or chunks.MemoryChunk), writing pin changes
+        as they are seen; returns the frames analysed. `pressure` (0..1) is
+        how far behind the caller is; the sampler skips more frames as it grows."""
+        if session_id != self.session_id:
+            self.reset(session_id)
+        started = time.perf_counter()
+        self._acquire()
+        setup = time.perf_counter() - started
+        try:
+            processed, _ = self._run(video, self._write_changes, pressure)
+        finally:
+            if not self.persistent:
+                started = time.perf_counter()
+                self._release()
+                setup += time.perf_counter() - started
+            self._setup.append(setup)
+            self.chunks += 1
+        self.frames += processed
+        return processed
+
+    def detect(self, video, session_id=None, pressure: float = 0.0) -> Tuple[int, FingerStates, float]:
+        """Analyse one chunk without touching the board:
+        (frames analysed, finger states per hand frame, seconds of video)."""
+        if session_id != self.session_id:
+            self.reset(session_id)
+        self._acquire(board=False)
+        states: FingerStates = []
+        processed, seconds = self._run(video, states.append, pressure)
+        self.chunks += 1
+        self.frames += processed
+        return processed, states, seconds
+
+    def _write_changes(self, states: List[int]):
+        # Compared with the carried state, so a new chunk only sends what moved
+        for i, state in enumerate(states):
+            if state != self.last_state[i]:
+                self._esp.set_pin_state(FINGER_TO_PIN[i], state)
+        self.last_state = states
+
+    def _run(self, video, on_states: Callable[[List[int]], Any], pressure: float) -> Tuple[int, float]:
+        cv2, _ = load_vision()
+        # The capture keeps its own handle on an in-memory chunk
+        with chunk_path(video) as video_path:
+            cap = cv2.VideoCapture(video_path)
+        try:
+            if not cap.isOpened():
+                logger.error(f"Could not open video file: {video}")
+                return 0, 0.0
+            self.sampler.start(pressure)
+            processed = self._analyse(cv2, cap, on_states)
+            # Position of the last frame read: the chunk's length, near enough
+            return processed, cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+        finally:
+            cap.release()
+
+    def _analyse(self, cv2, cap, on_states: Callable[[List[int]], Any]) -> int:
+        hands = self._hands
+        processed_frames = 0
+
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            # Skip frames that barely differ from the last one analysed
+            if not self.sampler.should_infer(frame):
+                continue
+
+            processed_frames += 1
+
+            # Flip frame horizontally for mirror effect
+            frame = cv2.flip(frame, 1)
+
+            # Convert BGR to RGB for MediaPipe
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            result = hands.process(rgb)
+
+            if result.multi_hand_landmarks:
+                for hand_landmarks in result.multi_hand_landmarks:
+                    # Get finger states
+                    states = get_finger_states(hand_landmarks)
+                    on_states(states)
+
+                    # Log finger states for debugging
+                    finger_names = ['Thumb', 'Index', 'Middle', 'Ring', 'Pinky']
+                    active_fingers = [finger_names[i] for i, state in enumerate(states) if state]
+                    if active_fingers:
+                        logger.debug(f"Active fingers: {', '.join(active_fingers)}")
+
+        return processed_frames
+
+    # -- reporting / shutdown ------------------------------------------------------
+
+    def stats(self) -> dict:
+        setup = sorted(self._setup)
+
+        def setup_ms(q):
+            return round(setup[int(q * (len(setup) - 1))] * 1e3, 3) if setup else None
+
+        stats = {
+            "persistent": self.persistent,
+            "chunks": self.chunks,
+            "frames": self.frames,
+            "resets": self.resets,
+            "sampler": self.sampler.stats(),
+            "setup_p50_ms": setup_ms(0.50),
+            "setup_p99_ms": setup_ms(0.99),
+        }
+        if isinstance(self._esp, CoalescingWriter):
+            stats["pin_writes"] = self._esp.stats()
+        return stats
+
+    def close(self):
+        self._release()
+        self.session_id = None
+
+
+# -- process pool ---------------------------------------------------------------
+
+_process_worker: Optional[GestureWorker] = None
+
+
+def _init_process():
+    global _process_worker
+    _process_worker = GestureWorker()
+
+
+def _detect(video, session_id, pressure) -> Tuple[int, FingerStates, float]:
+    """Runs in a pool process, on that process's own Hands model."""
+    return _process_worker.detect(video, session_id, pressure)
+
+
+class GesturePool:
+    """Gesture analysis on `processes` worker processes, each with its own Hands model.
+
+    Workers only detect; their finger states come back to this process,
+    where each stream's StreamSession puts chunks in order, drops late
+    ones and turns the states into pin writes against the finger state
+    the previous chunk left. One writer thread sends them, in release
+    order, through one board connection, so board I/O never holds the lock.
+    processes=0 analyses on a single thread in this process instead.
+    submit() blocks once INFLIGHT_PER_PROCESS chunks per process are
+    outstanding, so a backlog stays visible in the caller's queue.
+    """
+
+    def __init__(self, processes: int, host: str = "", port: int = 1234,
+                 coalesce_window: Optional[float] = COALESCE_WINDOW,
+                 min_pin_interval: float = MIN_PIN_INTERVAL):
+        self.processes = processes
+        self.host = host
+        self.port = port
+        self.coalesce_window = coalesce_window
+        self.min_pin_interval = min_pin_interval
+        self._executor = None
+        self._esp = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(1, processes) * INFLIGHT_PER_PROCESS)
+        self._sessions: Dict[Any, StreamSession] = {}
+        self._writes: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.late = 0
+        self.frames = 0
+        self.commands = 0
+        self.write_errors = 0
+
+    def _start(self):
+        # Started on first use: importing or building the pool forks nothing
+        if self._executor is None:
+            if self.processes > 0:
+                # Spawned, not forked: the server is multithreaded (connection monitor,
+                # writer thread, held locks), and each worker builds its model fresh
+                self._executor = ProcessPoolExecutor(
+                    self.processes, mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_process)
+            else:
+                self._executor = ThreadPoolExecutor(1, thread_name_prefix="gesture",
+                                                    initializer=_init_process)
+        return self._executor
+
+    def _session(self, session_id, chunk_id, timestamp) -> StreamSession:
+        session = self._sessions.get(session_id)
+        if session is None or session.restarted_by(chunk_id, timestamp):
+            idle = time.monotonic() - SESSION_TTL
+            for key in [key for key, s in self._sessions.items()
+                        if s.touched < idle and not s.inflight and not s.done]:
+                del self._sessions[key]
+            session = self._sessions[session_id] = StreamSession(session_id, len(FINGER_TO_PIN))
+        return session
+
+    def submit(self, video, chunk_id=None, timestamp=None, session_id=None,
+               on_done: Optional[Callable[[Optional[int], Optional[BaseException]], Any]] = None,
+               pressure: float = 0.0) -> Future:
+        """Queue a chunk for analysis; on_done(frames, error) runs once its commands were
+        applied, or straight away with a LateChunk error if it is too late to apply.
+        `pressure` (0..1) widens frame sampling when the caller is falling behind."""
+        with self._lock:
+            session = self._session(session_id, chunk_id, timestamp)
+            number, late = session.admit(chunk_id, timestamp)
+            if late:
+                self.late += 1
+        if late:
+            future = Future()
+            future.set_exception(LateChunk(late))
+            if on_done is not None:
+                on_done(None, future.exception())
+            return future
+
+        self._slots.acquire()
+        with self._lock:
+            executor = self._start()
+            self.submitted += 1
+        try:
+            future = executor.submit(_detect, video, session_id, pressure)
+        except Exception as e:
+            # e.g. the pool broke since the last chunk: report it like any failed chunk
+            future = Future()
+            future.set_exception(e)
+        future.add_done_callback(
+            lambda f: self._finished(f, executor, session, number, timestamp, on_done))
+        return future
+
+    def _finished(self, future: Future, executor, session: StreamSession, number: int,
+                  timestamp, on_done):
+        self._slots.release()
+        error = future.exception()
+        if isinstance(error, BrokenExecutor):
+            # A worker process died (e.g. crashed in native code); start a fresh pool next time
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+                    executor.shutdown(wait=False)
+        result = (None, [], 0.0) if error else future.result()
+        with self._lock:
+            self.completed += 1
+            self.failed += error is not None
+            self.frames += result[0] or 0
+            session.complete(number, (result, timestamp, error, on_done))
+        self._release(session)
+
+    def _release(self, session: StreamSession):
+        # Commands are worked out under the lock and queued in chunk order;
+        # the writer thread sends them and runs the callbacks outside it
+        with self._lock:
+            if session.timer is not None:
+                session.timer.cancel()
+                session.timer = None
+            ready, wait = session.release()
+            for (frames, states, seconds), timestamp, error, done in ready:
+                commands = session.changes(states, FINGER_TO_PIN)
+                session.applied(timestamp, seconds)
+                self._write(commands, frames, error, done)
+            if wait is not None:
+                # Held for a missing predecessor: release it anyway once the window passes
+                session.timer = threading.Timer(wait, self._release, (session,))
+                session.timer.daemon = True
+                session.timer.start()
+
+    def _write(self, commands: List[PinCommand], frames, error, done):
+        # Called under the lock, so batches are queued in release order
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name="gesture-writer",
+                                            daemon=True)
+            self._writer.start()
+        self._writes.put((commands, frames, error, done))
+
+    def _write_loop(self):
+        while True:
+            item = self._writes.get()
+            if item is None:
+                return
+            commands, frames, error, done = item
+            self._apply(commands)
+            if done is not None:
+                try:
+                    done(frames, error)
+                except Exception as e:
+                    logger.warning(f"Chunk completion callback failed: {e}")
+
+    def _apply(self, commands: List[PinCommand]):
+        # Only the writer thread touches the board
+        if not commands:
+            return
+        if self._esp is None:
+            self._esp = open_board(self.host, self.port, self.coalesce_window, self.min_pin_interval)
+        sent = failed = 0
+        for pin, state in commands:
+            try:
+                self._esp.set_pin_state(pin, state)
+                sent += 1
+            except Exception as e:
+                failed += 1
+                logger.warning(f"Gesture pin write failed: {e}")
+        with self._lock:
+            self.commands += sent
+            self.write_errors += failed
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {
+                "processes": self.processes,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "late": self.late,
+                "inferred_per_chunk": round(self.frames / self.completed, 1) if self.completed else None,
+                "commands": self.commands,
+                "write_errors": self.write_errors,
+                "sessions": {str(key): s.stats() for key, s in self._sessions.items()},
+            }
+            if isinstance(self._esp, CoalescingWriter):
+                stats["pin_writes"] = self._esp.stats()
+        return stats
+
+    def close(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+        with self._lock:
+            for session in self._sessions.values():
+                if session.timer is not None:
+                    session.timer.cancel()
+        # Results still held for a missing predecessor are applied now
+        for session in list(self._sessions.values()):
+            with self._lock:
+                session.done = {n: (0.0, r) for n, (_, r) in session.done.items()}
+            self._release(session)
+        with self._lock:
+            writer, self._writer = self._writer, None
+            if writer is not None:
+                self._writes.put(None)
+        if writer is not None:
+            writer.join()
+        if self._esp is not None:
+            self._esp.disconnect()
+            self._esp = None
@@ -0,0 +1,142 @@
+"""Persistent WebSocket control channel for the dashboard (needs: pip install flask-sock).
+
+Messages are JSON text frames. Client -> server:
+
+    {"id": 1, "type": "toggle", "device": "light", "state": 1}
+    {"id": 2, "type": "batch", "states": {"light": 1, "fan": 0}}
+    {"id": 3, "type": "ping"}
+
+Server -> client:
+
+    {"type": "ack", "id": 1, "ok": true, "results": {"light": "OK"}}
+    {"type": "ack", "id": 2, "ok": false, "error": "..."}
+    {"type": "state", "states": {"fan": 0}}          # changed devices only
+
+Commands run on a shared worker pool, so a slow board round trip never
+blocks the socket. Acks are sent as each command finishes and may arrive
+out of order; match them by id.
+"""
+import json
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from events import StatusBroadcaster
+from interactor import logger
+
+try:
+    from flask_sock import Sock
+    from simple_websocket import ConnectionClosed
+except ImportError:  # optional dependency
+    Sock = None
+    ConnectionClosed = OSError
+
+WS_WORKERS = 8
+STATE_WAIT = 1.0  # seconds the state pump waits before re-checking for shutdown
+
+ApplyFn = Callable[[Dict[str, int]], Dict[str, str]]
+
+
+class ControlSession:
+    """One connected client: reader loop, writer thread and state pump."""
+
+    def __init__(self, ws, apply: ApplyFn, events: StatusBroadcaster, pool: ThreadPoolExecutor):
+        self.ws = ws
+        self.apply = apply
+        self.events = events
+        self.pool = pool
+        self._outbox: "queue.Queue[Optional[dict]]" = queue.Queue()
+        self._closed = threading.Event()
+
+    def run(self):
+        sub = self.events.subscribe()
+        writer = threading.Thread(target=self._write, name="ws-writer", daemon=True)
+        pump = threading.Thread(target=self._pump, args=(sub,), name="ws-state", daemon=True)
+        writer.start()
+        pump.start()
+        try:
+            while not self._closed.is_set():
+                raw = self.ws.receive()
+                if raw is None:
+                    break
+                self._handle(raw)
+        except ConnectionClosed:
+            pass
+        finally:
+            self._closed.set()
+            self.events.unsubscribe(sub)
+            self._outbox.put(None)
+            writer.join(timeout=5)
+
+    def _handle(self, raw):
+        request_id = None
+        try:
+            msg = json.loads(raw)
+            request_id = msg.get("id")
+            kind = msg.get("type")
+            if kind == "toggle":
+                states = {msg["device"]: int(msg["state"])}
+            elif kind == "batch":
+                states = {device: int(state) for device, state in msg["states"].items()}
+            elif kind == "ping":
+                self._send({"type": "ack", "id": request_id, "ok": True})
+                return
+            else:
+                raise ValueError(f"Unknown message type: {kind!r}")
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            self._send({"type": "ack", "id": request_id, "ok": False, "error": str(e)})
+            return
+
+        future = self.pool.submit(self.apply, states)
+        future.add_done_callback(lambda f: self._send(self._ack(request_id, f)))
+
+    @staticmethod
+    def _ack(request_id, future: Future) -> dict:
+        error = future.exception()
+        if error is not None:
+            return {"type": "ack", "id": request_id, "ok": False, "error": str(error)}
+        results = future.result()
+        ok = all("OK" in response for response in results.values())
+        return {"type": "ack", "id": request_id, "ok": ok, "results": results}
+
+    def _send(self, msg: dict):
+        if not self._closed.is_set():
+            self._outbox.put(msg)
+
+    def _write(self):
+        while True:
+            msg = self._outbox.get()
+            if msg is None:
+                return
+            try:
+                self.ws.send(json.dumps(msg))
+            except (ConnectionClosed, OSError):
+                self._closed.set()
+                return
+
+    def _pump(self, sub):
+        while not self._closed.is_set():
+            changes = self.events.take(sub, STATE_WAIT)
+            if changes:
+                self._send({"type": "state", "states": changes})
+
+
+def register_control_socket(app, apply: ApplyFn, events: StatusBroadcaster,
+                            route: str = "/ws") -> bool:
+    """Add the WebSocket endpoint to `app`; returns False if flask-sock isn't installed.
+
+    `apply` takes {device: state}, performs the writes and returns
+    {device: board response}; it should raise ValueError for unknown devices.
+    """
+    if Sock is None:
+        logger.warning(f"flask-sock is not installed; {route} WebSocket control is disabled.")
+        return False
+    sock = Sock(app)
+    pool = ThreadPoolExecutor(WS_WORKERS, thread_name_prefix="ws-control")
+
+    @sock.route(route)
+    def control_socket(ws):
+        ControlSession(ws, apply, events, pool).run()
+
+    return True
@@ -0,0 +1,57 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "ServerPy"))
+
+from coalesce import CoalescingWriter  # noqa: E402
+from scheduler import PinScheduler  # noqa: E402
+
+
+class SlowBoard:
+    """Acknowledges each batch only after `delay` seconds."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.pin_states = {}
+
+    def set_pin_states(self, commands):
+        time.sleep(self.delay)
+        self.pin_states.update(commands)
+        return [(pin, state, "OK") for pin, state in commands]
+
+
+class CoalescingWriterTest(unittest.TestCase):
+    def test_write_reverting_an_inflight_write_is_sent(self):
+        board = SlowBoard(0.2)
+        board.pin_states[13] = 0
+        writer = CoalescingWriter(board, window=0.01)
+        writer.set_pin_state(13, 1)
+        time.sleep(0.05)  # the 1 is now in flight, board still says 0
+        writer.set_pin_state(13, 0)
+        writer.flush()
+        writer.close()
+        self.assertEqual(board.pin_states, {13: 0})
+
+
+class PinSchedulerTest(unittest.TestCase):
+    def test_runs_jobs_added_after_heap_compaction(self):
+        # Cancelling most of the heap compacts it while the timer thread is waiting
+        ran = threading.Event()
+        with PinScheduler(object()) as sched:
+            ids = [sched.call_later(1000, lambda esp: None) for _ in range(100)]
+            time.sleep(0.05)
+            for job_id in ids:
+                sched.cancel(job_id)
+            sched.call_later(0.01, lambda esp: ran.set())
+            self.assertTrue(ran.wait(2))
+            time.sleep(0.05)
+            stats = sched.stats()
+        self.assertEqual(stats["runs"], 1)
+        self.assertEqual(stats["pending"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()